@@ -4,37 +4,64 @@
 
 from controller import Supervisor
 import os
-import random
+import sys
 import struct
-import math
 import datetime
 import threading
 import ControllerUploader
 import glob
+import collections
+import tempfile
+import shutil
+import time
+import json
+import SpatialGrid
+import ScoringEngine
+import WorldParser
+import PhaseTimer
+import MatchLog
+import PoseTrace
 
 # Create the instance of the supervisor class
 supervisor = Supervisor()
 
+# Unpacks the data sent by the robots (est. x position, est. z position, est. victim type)
+packetFormat = struct.Struct('i i c')
+
 # Get this supervisor node - so that it can be rest when game restarts
 mainSupervisor = supervisor.getFromDef("MAINSUPERVISOR")
 
+# Directory containing the controllers (found before the uploader changes the working directory)
+controllersDir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
 maxTimeMinute = 8
 # Maximum time for a match
 maxTime = maxTimeMinute * 60
 
 DEFAULT_MAX_VELOCITY = 6.28
 
+# Number of events shown in the robot window history
+HISTORY_LENGTH = 9
+# Number of events written to a staged history before it is flushed to disk
+HISTORY_BATCH_SIZE = 32
+
+# Maximum number of updates sent to the robot window per second (of wall time)
+WINDOW_UPDATE_RATE = 10
+
+# Phases of the main loop that are timed when profiling
+PROFILE_PHASES = ["receiver", "snapshot", "trace", "scoring", "events", "window", "step"]
+
 
 class Queue:
-    #Simple queue data structure
-    def __init__(self):
-        self.queue = []
+    #Simple queue data structure, the oldest items are dropped once capacity is reached
+    def __init__(self, capacity=None):
+        self.queue = collections.deque(maxlen=capacity)
 
     def enqueue(self, data):
         return self.queue.append(data)
 
     def dequeue(self):
-        return self.queue.pop(0)
+        return self.queue.popleft()
 
     def peek(self):
         return self.queue[0]
@@ -44,18 +71,29 @@ class Queue:
 
 
 class RobotHistory(Queue):
-    #Robot history class inheriting a queue structure
-    def __init__(self):
-        super().__init__()
-        #master history to store all events without dequeues
-        self.master_history = []
+    #Robot history class inheriting a ring buffer of the latest events
+    def __init__(self, path=None):
+        super().__init__(HISTORY_LENGTH)
+        #master history of all events, streamed to a file next to the logs as they happen so a crash keeps them
+        self.path = path
+        self.master_history = None
+        if path is not None:
+            try:
+                self.master_history = open(path, "w+")
+            except OSError:
+                print("Couldn't stage history in the log directory " + path)
+                self.path = None
+        if self.master_history is None:
+            self.master_history = tempfile.TemporaryFile("w+")
+        #events written since the last flush
+        self.pending = 0
+        #number of events ever enqueued
+        self.count = 0
 
     def enqueue(self, data):
         #update master history when an event happens
         self.update_master_history(data)
-
-        if len(self.queue) > 8:
-            self.dequeue()
+        self.count += 1
 
         return self.queue.append(data)
 
@@ -63,16 +101,112 @@ class RobotHistory(Queue):
         #Get time
         time = int(maxTime - timeElapsed)
         minute = str(datetime.timedelta(seconds=time))[2:]
-        #update list with data in format [game time, event data]
-        record = [minute, data]
-        self.master_history.append(record)
+        #append line with data in format "game time event data"
+        self.master_history.write(minute + " " + data + "\n")
+        #hand the events to the OS in batches, a crash loses at most the last batch
+        self.pending += 1
+        if self.pending >= HISTORY_BATCH_SIZE:
+            self.flush()
+
+    def flush(self) -> None:
+        #write the buffered events to the staged history
+        self.master_history.flush()
+        self.pending = 0
+
+    def write_master_history(self, file) -> None:
+        #copy all events to a file
+        self.master_history.seek(0)
+        shutil.copyfileobj(self.master_history, file)
+        self.master_history.seek(0, os.SEEK_END)
+
+    def close(self, remove=True) -> None:
+        #close the staged history, removing it once it has been written to the log
+        if self.master_history.closed:
+            return
+        self.master_history.close()
+        if remove and self.path is not None:
+            try:
+                os.remove(self.path)
+            except OSError:
+                pass
+
+
+class WindowPublisher:
+    '''Coalesces state changes and sends them to the robot window at a limited rate'''
+
+    # Fields of the update message, in the order the window reads them
+    FIELDS = ["score", "time"]
+
+    def __init__(self, history, numberOfRobots=1, rate=WINDOW_UPDATE_RATE):
+        self.history = history
+        # The scores of any other robots follow the time
+        self.fields = self.FIELDS + ["score" + str(i) for i in range(1, numberOfRobots)]
+        # Minimum wall time between two sends
+        self.interval = 1.0 / rate
+        self.lastSend = None
+        # Latest and last sent value of each field
+        self.values = {}
+        self.sentValues = {}
+        # Number of history events the window has been sent (None until the first full send)
+        self.historySent = None
+
+    def setField(self, name: str, value) -> None:
+        self.values[name] = value
+
+    def publish(self, force=False) -> None:
+        '''Send the fields and history events that changed since the last send'''
+        now = time.monotonic()
+        if not force and self.lastSend is not None and now - self.lastSend < self.interval:
+            return
+        self.lastSend = now
+
+        # Only changed fields are filled in, the rest are left empty
+        changed = False
+        parts = []
+        for name in self.fields:
+            value = self.values.get(name)
+            if value is not None and value != self.sentValues.get(name):
+                self.sentValues[name] = value
+                parts.append(str(value))
+                changed = True
+            else:
+                parts.append("")
+        if changed:
+            windowSend("update," + ",".join(parts))
+
+        if self.historySent is None:
+            # Replace whatever the window was showing
+            windowSend("historyUpdate" + "," + ",".join(self.history.queue))
+        elif self.history.count > self.historySent:
+            # Only send the events that were added (at most the visible ones)
+            newEvents = min(self.history.count - self.historySent, len(self.history.queue))
+            events = list(self.history.queue)[-newEvents:]
+            windowSend("historyAppend" + "," + ",".join(events))
+        self.historySent = self.history.count
+
+
+class RobotSnapshot:
+    '''Robot state read from Webots once per step'''
+
+    def __init__(self):
+        self.position = [0, 0, 0]
+        self.rotation = [0, 1, 0, 0]
+        self.velocity = [0, 0, 0, 0, 0, 0]
+        self.time = 0
+
+    def update(self, robot) -> None:
+        '''Read the robot's position, rotation and velocity from its node'''
+        self.position = robot.wb_translationField.getSFVec3f()
+        self.rotation = robot.wb_rotationField.getSFRotation()
+        self.velocity = robot.wb_node.getVelocity()
+        self.time = supervisor.getTime()
 
 
 class Robot:
     '''Robot object to hold values whether its in a base or holding a human'''
 
-    def __init__(self, node=None):
-        '''Initialises the in a base, has a human loaded and score values'''
+    def __init__(self, node=None, historyPath=None):
+        '''Initialises the in a base, has a human loaded values (the score is kept by the scoring engine)'''
 
         #webots node
         self.wb_node = node
@@ -80,22 +214,7 @@ class Robot:
         self.wb_translationField = self.wb_node.getField('translation')
         self.wb_rotationField = self.wb_node.getField('rotation')
 
-        self.inCheckpoint = True
-        self.inSwamp = True
-
-        self.history = RobotHistory()
-
-        self._score = 0
-
-        self.robot_timeStopped = 0
-        self.stopped = False
-        self.stoppedTime = None
-
-        self.message = []
-
-        self.lastVisitedCheckPointPosition = []
-
-        self.visitedCheckpoints = []
+        self.history = RobotHistory(historyPath)
 
         self.startingTile = None
 
@@ -103,7 +222,8 @@ class Robot:
 
         self.name = "NO_TEAM_NAME"
 
-        self.left_exit_tile = False
+        # State of the robot for the current step
+        self.snapshot = RobotSnapshot()
 
 
     @property
@@ -113,6 +233,8 @@ class Robot:
     @position.setter
     def position(self, pos: list) -> None:
         self.wb_translationField.setSFVec3f(pos)
+        # Keep the step's snapshot in line with the move
+        self.snapshot.position = pos
 
     @property
     def rotation(self) -> list:
@@ -121,93 +243,60 @@ class Robot:
     @rotation.setter
     def rotation(self, pos: list) -> None:
         self.wb_rotationField.setSFRotation(pos)
+        self.snapshot.rotation = pos
+
+    def updateSnapshot(self) -> None:
+        '''Read the robot's state for this step'''
+        self.snapshot.update(self)
 
     def setMaxVelocity(self, vel: float) -> None:
         self.wb_node.getField('max_velocity').setSFFloat(vel)
 
-    def _isStopped(self) -> bool:
-        vel = self.wb_node.getVelocity()
-        return abs(vel[0]) < 0.01 and abs(vel[1]) < 0.01 and abs(vel[2]) < 0.01
-
-
-    def timeStopped(self) -> float:
-        self.stopped = self._isStopped()
-
-        # if it isn't stopped yet
-        if self.stoppedTime == None:
-            if self.stopped:
-                # get time the robot stopped
-                self.stoppedTime = supervisor.getTime()
-        else:
-            # if its stopped
-            if self.stopped:
-                # get current time
-                currentTime = supervisor.getTime()
-                # calculate the time the robot stopped
-                self.robot_timeStopped = currentTime - self.stoppedTime
-            else:
-                # if it's no longer stopped, reset variables
-                self.stoppedTime = None
-                self.robot_timeStopped = 0
-
-        return self.robot_timeStopped
-
-    def increaseScore(self, score: int) -> None:
-        if self._score + score < 0:
-            self._score = 0
-        else:
-            self._score += score
-
-    def getScore(self) -> int:
-        return self._score
-
     def get_log_str(self):
         #Create a string of all events that the robot has done
         history = self.history.master_history
-        log_str = ""
-        for event in history:
-            log_str += str(event[0]) + " " + event[1] + "\n"
+        history.seek(0)
+        log_str = history.read()
+        history.seek(0, os.SEEK_END)
 
         return log_str
 
 
-class Human():
+class Human(ScoringEngine.Victim):
     '''Human object holding the boundaries'''
 
-    def __init__(self, node, ap: int, vtype: str, score: int):
+    def __init__(self, node, ap: int, vtype: str, score: int, position: list, rotation: list):
         '''Initialises the radius and position of the human'''
 
         self.wb_node = node
 
         self.wb_translationField = self.wb_node.getField('translation')
-
         self.wb_rotationField = self.wb_node.getField('rotation')
 
         self.wb_typeField = self.wb_node.getField('type')
         self.wb_foundField = self.wb_node.getField('found')
 
-        self.arrayPosition = ap
-        self.scoreWorth = score
-        self.radius = 0.09
-        self._victim_type = vtype
-
-        self.simple_victim_type = self.get_simple_victim_type()
+        # Victims do not move during a match so their geometry is only read once
+        super().__init__(position, rotation, ap, vtype, score)
 
     @property
     def position(self) -> list:
-        return self.wb_translationField.getSFVec3f()
+        return self._position
 
     @position.setter
     def position(self, pos: list) -> None:
         self.wb_translationField.setSFVec3f(pos)
+        self._position = pos
 
     @property
     def rotation(self) -> list:
-        return self.wb_rotationField.getSFRotation()
+        return self._rotation
 
     @rotation.setter
     def rotation(self, pos: list) -> None:
         self.wb_rotationField.setSFRotation(pos)
+        self._rotation = pos
+        self.normal = SpatialGrid.facingNormal(pos)
 
     @property
     def victim_type(self) -> list:
@@ -225,112 +314,44 @@ class Human():
     def identified(self, idfy: int):
         self.wb_foundField.setSFBool(idfy)
 
-    def get_simple_victim_type(self):
-        # Get victim type via proto node
-        if self._victim_type == 'harmed':
-            return 'H'
-        elif self._victim_type == 'unharmed':
-            return 'U'
-        elif self._victim_type == 'stable':
-            return 'S'
-        elif self._victim_type == 'Heat': # Temperature victim
-            return 'T'
-        else:
-            return self._victim_type
-
-    def checkPosition(self, pos: list) -> bool:
-        '''Check if a position is near an object, based on the min_dist value'''
-        # Get distance from the object to the passed position using manhattan distance for speed
-        # TODO Check if we want to use euclidian or manhattan distance -- currently manhattan
-        distance = math.sqrt(((self.position[0] - pos[0])**2) + ((self.position[2] - pos[2])**2))
-        return distance <= self.radius
-
-    def onSameSide(self, pos: list) -> bool:
-        #Get side the victim pointing at
-
-        #0 1 0 -pi/2 -> X axis
-        #0 1 0 pi/2 -> -X axis
-        #0 1 0 pi -> Z axis
-        #0 1 0 0 -> -Z axis
-
-        rot = self.rotation[3]
-        rot = round(rot, 2)
-
-        if rot == -1.57:
-            #X axis
-            robot_x = pos[0]
-            if robot_x > self.position[0]:
-                return True
-        elif rot == 1.57:
-            #-X axis
-            robot_x = pos[0]
-            if robot_x < self.position[0]:
-                return True
-        elif rot == 3.14:
-            #Z axis
-            robot_z = pos[2]
-            if robot_z > self.position[2]:
-                return True
-        elif rot == 0:
-            #-Z axis
-            robot_z = pos[2]
-            if robot_z < self.position[2]:
-                return True
-
-        return False
-
-
-
-
-class Tile():
-    '''Tile object holding the boundaries'''
-
-    def __init__(self, min: list, max: list, center: list):
-        '''Initialize the maximum and minimum corners for the tile'''
-        self.min = min
-        self.max = max
-        self.center = center
-
-    def checkPosition(self, pos: list) -> bool:
-        '''Check if a position is in this checkpoint'''
-        # If the x position is within the bounds
-        if pos[0] >= self.min[0] and pos[0] <= self.max[0]:
-            # if the z position is within the bounds
-            if pos[2] >= self.min[1] and pos[2] <= self.max[1]:
-                # It is in this checkpoint
-                return True
-
-        # It is not in this checkpoint
-        return False
-
-
-class Checkpoint(Tile):
-    '''Checkpoint object holding the boundaries'''
-
-    def __init__(self, min: list, max: list, center=None):
-        super().__init__(min, max, center)
 
+class StartTile(ScoringEngine.Tile):
+    '''StartTile object holding the boundaries'''
 
-class Swamp(Tile):
-    '''Swamp object holding the boundaries'''
+    def __init__(self, min: list, max: list, center=None, id=None):
+        super().__init__(min, max, center, id)
+        # Every start boundary is on the world's single start tile node
+        self.wb_node = supervisor.getFromDef("START_TILE")
 
-    def __init__(self, min: list, max: list, center=None):
-        super().__init__(min, max, center)
 
 
-class StartTile(Tile):
-    '''StartTile object holding the boundaries'''
+def windowSend(text: str) -> None:
+    '''Send a message to the robot window (nothing is sent when headless)'''
+    if not headless:
+        supervisor.wwiSendText(text)
 
-    def __init__(self, min: list, max: list, wb_node, center=None):
-        super().__init__(min, max, center)
-        self.wb_node = wb_node
+def isHeadless() -> bool:
+    '''Check if the match should run without the robot window'''
+    # Set by the environment or by "headless" in the supervisor's customData
+    if os.environ.get("RESCUEMAZE_HEADLESS", "") not in ("", "0"):
+        return True
+    customData = mainSupervisor.getField("customData").getSFString()
+    return "headless" in customData.split(",")
 
+def getTick() -> int:
+    '''Get the number of 32ms steps between each update of the match (from RESCUEMAZE_TICK, default 1)'''
+    try:
+        return max(1, int(os.environ.get("RESCUEMAZE_TICK", "1")))
+    except ValueError:
+        return 1
 
+def isProfiling() -> bool:
+    '''Check if the phases of the main loop should be timed'''
+    return os.environ.get("RESCUEMAZE_PROFILE", "") not in ("", "0")
 
 def resetControllerFile(number: int) -> None:
     '''Remove the controller'''
-    path = os.path.dirname(os.path.abspath(__file__))
-    path = os.path.join(path, "robot"+str(number)+"Controller")
+    path = os.path.join(controllersDir, "robot"+str(number)+"Controller")
     path = os.path.join(path, "robot"+str(number)+"Controller.*")
 
     for file in glob.glob(path):
@@ -339,10 +360,7 @@ def resetControllerFile(number: int) -> None:
 def resetController(num: int) -> None:
     '''Send message to robot window to say that controller has been unloaded'''
     resetControllerFile(num)
-    supervisor.wwiSendText("unloaded"+str(num))
-
-def updateHistory():
-    supervisor.wwiSendText("historyUpdate" + "," + ",".join(robot0Obj.history.queue))
+    windowSend("unloaded"+str(num))
 
 def getHumans(humans, numberOfHumans):
     '''Get humans in simulation'''
@@ -352,50 +370,95 @@ def getHumans(humans, numberOfHumans):
         # Get each human from children field in the human root node HUMANGROUP
         human = humanNodes.getMFNode(i)
 
-        victimType = human.getField('type').getSFString()
-        scoreWorth = human.getField('scoreWorth').getSFInt32()
+        if worldModel is not None:
+            # Values from the world's sidecar file
+            victimType = worldModel.victimTypes[i]
+            scoreWorth = worldModel.victimScores[i]
+            position = worldModel.getVictimPosition(i)
+            rotation = worldModel.getVictimRotation(i)
+        else:
+            victimType = human.getField('type').getSFString()
+            scoreWorth = human.getField('scoreWorth').getSFInt32()
+            position = human.getField('translation').getSFVec3f()
+            rotation = human.getField('rotation').getSFRotation()
 
         # Create Human Object from human position
-        humanObj = Human(human, i, victimType, scoreWorth)
+        humanObj = Human(human, i, victimType, scoreWorth, position, rotation)
         humans.append(humanObj)
 
-def getSwamps(swamps, numberOfSwamps):
-    '''Get swamps in simulation'''
-    # Iterate for each swamp
-    for i in range(numberOfSwamps):
-        # Get the swamp minimum node and translation
-        swampMin = supervisor.getFromDef("swamp" + str(i) + "min")
-        minPos = swampMin.getField("translation")
-        # Get maximum node and translation
-        swampMax = supervisor.getFromDef("swamp" + str(i) + "max")
-        maxPos = swampMax.getField("translation")
-        # Get the vector positions
-        minPos = minPos.getSFVec3f()
-        maxPos = maxPos.getSFVec3f()
+def getTiles(tiles, numberOfTiles, name, tileClass):
+    '''Get the special tiles with the given boundary name in simulation'''
+    # Iterate for each tile
+    for i in range(numberOfTiles):
+        if worldModel is not None:
+            # Get the translations from the world's sidecar file
+            minPos, maxPos = worldModel.getBound(name, i)
+        else:
+            # Get the tile minimum node and translation
+            tileMin = supervisor.getFromDef(name + str(i) + "min")
+            minPos = tileMin.getField("translation")
+            # Get maximum node and translation
+            tileMax = supervisor.getFromDef(name + str(i) + "max")
+            maxPos = tileMax.getField("translation")
+            # Get the vector positions
+            minPos = minPos.getSFVec3f()
+            maxPos = maxPos.getSFVec3f()
 
         centerPos = [(maxPos[0]+minPos[0])/2,maxPos[1],(maxPos[2]+minPos[2])/2]
-        # Create a swamp object using the min and max (x,z)
-        swampObj = Checkpoint([minPos[0], minPos[2]], [maxPos[0], maxPos[2]], centerPos)
-        swamps.append(swampObj)
+        # Create a tile object using the min and max (x,z) with its index as the id
+        tileObj = tileClass([minPos[0], minPos[2]], [maxPos[0], maxPos[2]], centerPos, i)
+        tiles.append(tileObj)
+
+def getSwamps(swamps, numberOfSwamps):
+    '''Get swamps in simulation'''
+    getTiles(swamps, numberOfSwamps, "swamp", ScoringEngine.Swamp)
 
 def getCheckpoints(checkpoints, numberOfCheckpoints):
     '''Get checkpoints in simulation'''
-    # Iterate for each checkpoint
-    for i in range(numberOfCheckpoints):
-        # Get the checkpoint minimum node and translation
-        checkpointMin = supervisor.getFromDef("checkpoint" + str(i) + "min")
-        minPos = checkpointMin.getField("translation")
-        # Get maximum node and translation
-        checkpointMax = supervisor.getFromDef("checkpoint" + str(i) + "max")
-        maxPos = checkpointMax.getField("translation")
-        # Get the vector positions
-        minPos = minPos.getSFVec3f()
-        maxPos = maxPos.getSFVec3f()
+    getTiles(checkpoints, numberOfCheckpoints, "checkpoint", ScoringEngine.Checkpoint)
 
-        centerPos = [(maxPos[0]+minPos[0])/2,maxPos[1],(maxPos[2]+minPos[2])/2]
-        # Create a checkpoint object using the min and max (x,z)
-        checkpointObj = Checkpoint([minPos[0], minPos[2]], [maxPos[0], maxPos[2]], centerPos)
-        checkpoints.append(checkpointObj)
+def getTraps(traps, numberOfTraps):
+    '''Get traps in simulation'''
+    getTiles(traps, numberOfTraps, "trap", ScoringEngine.Trap)
+
+def getStartTiles(startTiles, numberOfStarts):
+    '''Get start tiles in simulation'''
+    getTiles(startTiles, numberOfStarts, "start", StartTile)
+
+def getRobotNodePath(num: int) -> str:
+    '''Get the path to the .wbo file of a robot'''
+    filePath = os.path.join(controllersDir, "MainSupervisor")
+    filePath = filePath.replace('\\', '/')
+    return filePath + '/../../nodes/robot'+str(num)+'.wbo'
+
+def countRobots() -> int:
+    '''Get the number of robots in the match (each in the world or with a .wbo file)'''
+    number = 0
+    while supervisor.getFromDef("ROBOT"+str(number)) is not None or os.path.exists(getRobotNodePath(number)):
+        number += 1
+    return max(number, 1)
+
+def getChannel(num: int) -> int:
+    '''Get the channel a robot sends its packets on (robot i sends on channel i + 1)'''
+    return num + 1
+
+def getReceiverName(num: int) -> str:
+    '''Get the name of the supervisor's receiver for the packets of a robot'''
+    return "receiver" if num == 0 else "receiver"+str(num)
+
+def getReceiver(num: int):
+    '''Get the receiver for the packets of a robot, listening on the robot's channel (None if the supervisor has no such receiver)'''
+    receiver = supervisor.getReceiver(getReceiverName(num))
+    if receiver is not None:
+        receiver.setChannel(getChannel(num))
+        receiver.enable(32)
+    return receiver
+
+def set_robot_channel(robotObj, num: int):
+    '''Make the robot send its packets on its own channel'''
+    channelField = robotObj.wb_node.getField("emitter_channel")
+    if channelField is not None:
+        channelField.setSFInt32(getChannel(num))
 
 def resetVictimsTextures():
     # Iterate for each victim
@@ -403,22 +466,12 @@ def resetVictimsTextures():
         humans[i].identified = False
 
 
-def relocate(robotObj):
-    '''Relocate robot to last visited checkpoint'''
-    # Get last checkpoint visited
-    relocatePosition = robotObj.lastVisitedCheckPointPosition
-
-    # Set position of robot
-    robotObj.position = [relocatePosition[0], -0.03, relocatePosition[2]]
+def relocate(robotObj, position: list):
+    '''Move robot to a position (the last visited checkpoint)'''
+    robotObj.position = position
     robotObj.rotation = [0,1,0,0]
 
-    # Update history with event
-    robotObj.history.enqueue("Lack of Progress - 5")
-    robotObj.history.enqueue("Relocating to checkpoint")
-    robotObj.increaseScore(-5)
-    updateHistory()
-
-def robot_quit(robotObj, num, manualExit):
+def robot_quit(robotObj, num):
     '''Quit robot from simulation'''
     # Quit robot if present
     if robotObj.inSimulation:
@@ -426,134 +479,312 @@ def robot_quit(robotObj, num, manualExit):
         robotObj.wb_node.remove()
         robotObj.inSimulation = False
         # Send message to robot window to update quit button
-        supervisor.wwiSendText("robotNotInSimulation"+str(num))
-        # Update history event whether its manual or via exit message
-        if manualExit:
-            robotObj.history.enqueue("Manual Exit")
-        else:
-            robotObj.history.enqueue("Successful Exit")
-
-def add_robot():
-    '''Add robot via .wbo file'''
-    global robot0
+        windowSend("robotNotInSimulation"+str(num))
+
+def applyEvents(events: list):
+    '''Apply the score events from the scoring engine to the robots and the world'''
+    for event in events:
+        num = event.robot
+        robotObj = robots[num]
+        # Update history (the engine has already updated the score)
+        if event.text is not None:
+            robotObj.history.enqueue(event.text)
+
+        if event.kind == ScoringEngine.ENTERED_CHECKPOINT:
+            print("Robot "+str(num)+" entered a checkpoint")
+        elif event.kind == ScoringEngine.LEFT_CHECKPOINT:
+            print("Robot "+str(num)+" exited a checkpoint")
+        elif event.kind == ScoringEngine.ENTERED_SWAMP:
+            # Cap the robot's velocity
+            robotObj.setMaxVelocity(ScoringEngine.SWAMP_VELOCITY)
+        elif event.kind == ScoringEngine.LEFT_SWAMP:
+            # If not in swamp, reset max velocity to default
+            robotObj.setMaxVelocity(DEFAULT_MAX_VELOCITY)
+        elif event.kind == ScoringEngine.IDENTIFIED_VICTIM:
+            humans[event.data].identified = True
+        elif event.kind == ScoringEngine.RELOCATED:
+            relocate(robotObj, event.data)
+        elif event.kind == ScoringEngine.EXITED:
+            robot_quit(robotObj, num)
+        elif event.kind == ScoringEngine.LEFT_START:
+            robotObj.startingTile.wb_node.getField("start").setSFBool(False)
+
+        if matchLog is not None:
+            # The change actually made to the score, so replaying the log gives the score shown in the match
+            matchLog.append(supervisor.getTime(), event.kind, event.scoreChange, num, robotObj.snapshot.position, event.text)
+
+def add_robot(num: int):
+    '''Add robot via .wbo file if it is not in the world, returns its node'''
+    robotNode = supervisor.getFromDef("ROBOT"+str(num))
     # If robot not present
-    if robot0 == None:
-        # Get relative path
-        filePath = os.path.dirname(os.path.abspath(__file__))
-        filePath = filePath.replace('\\', '/')
-
+    if robotNode == None:
         # Get webots root
         root = supervisor.getRoot()
         root_children_field = root.getField('children')
         # Get .wbo file to insert into world
-        root_children_field.importMFNode(12,filePath + '/../../nodes/robot0.wbo')
-        # Update robot0 variable
-        robot0 = supervisor.getFromDef("ROBOT0")
+        root_children_field.importMFNode(12, getRobotNodePath(num))
+        robotNode = supervisor.getFromDef("ROBOT"+str(num))
         # Update robot window to say robot is in simulation
-        supervisor.wwiSendText("robotInSimulation0")
-
-def create_log_str():
-    '''Create log text for log file'''
-    # Get robot events
-    r0_str = robot0Obj.get_log_str()
-
-    # Create log text
+        windowSend("robotInSimulation"+str(num))
+    return robotNode
+
+def create_robots():
+    '''Create the robot objects at their start tiles and the engine scoring their match'''
+    global robots, scoring
+    robots = []
+    # The events of each robot are staged in the logs dir until the log is written
+    stagePath = get_logs_dir() + datetime.datetime.now().strftime("log %m-%d-%y %H,%M,%S,%f")
+    for i in range(numberOfRobots):
+        # Get the robot node (adding it if it is not in the world)
+        robotObj = Robot(add_robot(i), stagePath + " robot" + str(i) + ".part")
+        windowSend("robotInSimulation"+str(i))
+        set_robot_channel(robotObj, i)
+        set_robot_start_pos(robotObj, i)
+        robots.append(robotObj)
+
+    # Apply the scoring rules to every robot's match at once
+    scoring = ScoringEngine.ScoringEngine(tileGrid, victimGrid, [robotObj.startingTile for robotObj in robots], numberOfCheckpoints, numberOfHumans)
+
+def create_log_header():
+    '''Create the log text that comes before the robots' events'''
     log_str = ""
     log_str += "MAX_GAME_DURATION: "+str(maxTimeMinute)+":00\n"
-    log_str += "ROBOT_0_SCORE: "+str(robot0Obj.getScore())+"\n"
-    log_str += "\n"
-    log_str += "ROBOT_0: "+str(robot0Obj.name)+"\n"
-    log_str += r0_str
+    for i, robotObj in enumerate(robots):
+        log_str += "ROBOT_"+str(i)+"_SCORE: "+str(scoring.getScore(i))+"\n"
+        log_str += "ROBOT_"+str(i)+"_CHECKPOINTS: "+scoring.getVisitedMask(i)+"\n"
     log_str += "\n"
 
     return log_str
 
-def write_log():
-    '''Write log file'''
-    # Get log text
-    log_str = create_log_str()
+def create_log_str():
+    '''Create log text for log file'''
+    # Create log text from the header and the events of each robot
+    log_str = create_log_header()
+    for i, robotObj in enumerate(robots):
+        log_str += "ROBOT_"+str(i)+": "+str(robotObj.name)+"\n"
+        log_str += robotObj.get_log_str() + "\n"
+    return log_str
+
+def get_logs_dir():
+    '''Get the path to the logs dir'''
+    filePath = controllersDir.replace('\\', '/')
+    return filePath + "/../logs/"
+
+def open_match_log():
+    '''Start the binary log and pose trace of the match'''
+    global matchLog, poseTrace
+    # Microseconds in the name so matches started in the same second have their own log
+    file_date = datetime.datetime.now()
+    filePath = get_logs_dir() + file_date.strftime("match %m-%d-%y %H,%M,%S,%f")
+    try:
+        matchLog = MatchLog.MatchLog(filePath + ".rmlog")
+        # Room for a sample at every update of the match
+        capacity = int(maxTime * 1000 / (32 * tick)) + 16
+        poseTrace = PoseTrace.PoseTrace(filePath + ".rmpose", numberOfRobots, capacity, 0.032 * tick)
+    except OSError:
+        print("Couldn't write match log, no log directory " + filePath)
+        if matchLog is not None:
+            matchLog.close()
+        matchLog = None
+        poseTrace = None
+        return
+
+    header = {"world": supervisor.getWorldPath(), "robots": [robotObj.name for robotObj in robots], "maxTime": maxTime, "poseTrace": poseTrace.path}
+    matchLog.append(supervisor.getTime(), MatchLog.MATCH_START, text=json.dumps(header))
+
+def close_match_log():
+    '''Record the final scores and close the binary log and pose trace of the match'''
+    global matchLog, poseTrace
+    if poseTrace is not None:
+        poseTrace.close()
+        poseTrace = None
+    if matchLog is None:
+        return
+    for i, robotObj in enumerate(robots):
+        matchLog.append(supervisor.getTime(), MatchLog.MATCH_END, scoring.getScore(i), i, robotObj.snapshot.position, scoring.getVisitedMask(i))
+    matchLog.close()
+    matchLog = None
+
+def find_staged_histories():
+    '''Warn about the histories left in the logs dir by a match whose log was never written'''
+    # They hold the robot's events as they appear in a log, so they are left for the user to keep or delete
+    for path in sorted(glob.glob(get_logs_dir() + "log * robot*.part")):
+        print("Found the events of a match whose log was not written: " + path)
+
+def write_log() -> bool:
+    '''Write log file, returns false if it couldn't be written'''
     # Get relative path to logs dir
-    filePath = os.path.dirname(os.path.abspath(__file__))
-    filePath = filePath.replace('\\', '/')
-    filePath = filePath + "/../logs/"
+    filePath = get_logs_dir()
 
     # Create file name using date and time
     file_date = datetime.datetime.now()
     logFileName = file_date.strftime("log %m-%d-%y %H,%M,%S")
 
     filePath += logFileName + ".txt"
+    # Written under a temporary name and renamed once complete
+    partPath = filePath + ".part"
 
     try:
-        # Write file
-        logsFile = open(filePath, "w")
-        logsFile.write(log_str)
+        # Write file, copying the events straight from the history stream
+        logsFile = open(partPath, "w")
+        logsFile.write(create_log_header())
+        for i, robotObj in enumerate(robots):
+            logsFile.write("ROBOT_"+str(i)+": "+str(robotObj.name)+"\n")
+            robotObj.history.write_master_history(logsFile)
+            logsFile.write("\n")
+        if phaseTimer.enabled:
+            # Time taken by each phase of the supervisor loop
+            logsFile.write("SUPERVISOR_PROFILE\n")
+            logsFile.write(phaseTimer.report())
         logsFile.close()
+        os.replace(partPath, filePath)
+        return True
     except:
         # If write file fails, most likely due to missing logs dir
         print("Couldn't write log file, no log directory " + filePath)
+        try:
+            os.remove(partPath)
+        except OSError:
+            pass
+        return False
 
-def set_robot_start_pos():
-    '''Set robot starting position'''
-
-    starting_tile_node = supervisor.getFromDef("START_TILE")
-
-
-    # Get the starting tile minimum node and translation
-    starting_PointMin = supervisor.getFromDef("start0min")
-    starting_minPos = starting_PointMin.getField("translation")
-
-    # Get maximum node and translation
-    starting_PointMax = supervisor.getFromDef("start0max")
-    starting_maxPos = starting_PointMax.getField("translation")
+def close_histories(remove=True):
+    '''Close the robots' staged histories, removing them if they are in the log (kept if the log couldn't be written)'''
+    for robotObj in robots:
+        robotObj.history.close(remove)
+
+def get_robot_result(num: int) -> dict:
+    '''Get the machine readable result of a robot's match'''
+    robotObj = robots[num]
+    # Split the event stream into its game time and event text
+    events = []
+    for line in robotObj.get_log_str().splitlines():
+        parts = line.split(" ", 1)
+        events.append({"time": parts[0], "event": parts[1]})
+
+    return {
+        "robot": robotObj.name,
+        "score": scoring.getScore(num),
+        "checkpoints": scoring.getVisitedMask(num),
+        "exited": not robotObj.inSimulation,
+        "events": events,
+    }
+
+def write_result(wallTime: float, steps: int):
+    '''Write the machine readable result of a headless match'''
+    # Robot 0's result is kept at the top level for single robot matches
+    result = {"world": supervisor.getWorldPath()}
+    result.update(get_robot_result(0))
+    result.update({
+        "robots": [get_robot_result(i) for i in range(numberOfRobots)],
+        "timings": {
+            "maxTime": maxTime,
+            "timeElapsed": timeElapsed,
+            "wallTime": wallTime,
+            "steps": steps,
+        },
+    })
+    if lastMatchLogPath is not None:
+        result["matchLog"] = lastMatchLogPath + ".rmlog"
+        result["poseTrace"] = lastMatchLogPath + ".rmpose"
+    if phaseTimer.enabled:
+        result["profile"] = phaseTimer.toDict()
+
+    # Use the given path, otherwise one in the logs dir named by date and time
+    filePath = os.environ.get("RESCUEMAZE_RESULT", "")
+    if filePath == "":
+        file_date = datetime.datetime.now()
+        filePath = get_logs_dir() + file_date.strftime("result %m-%d-%y %H,%M,%S") + ".json"
 
-    # Get the vector positons
-    starting_minPos = starting_minPos.getSFVec3f()
-    starting_maxPos = starting_maxPos.getSFVec3f()
-    starting_centerPos = [(starting_maxPos[0]+starting_minPos[0])/2,starting_maxPos[1],(starting_maxPos[2]+starting_minPos[2])/2]
+    try:
+        with open(filePath, "w") as resultFile:
+            json.dump(result, resultFile, indent=2)
+    except:
+        print("Couldn't write result file " + filePath)
 
-    startingTileObj = StartTile([starting_minPos[0], starting_minPos[2]], [starting_maxPos[0], starting_maxPos[2]], starting_tile_node, center=starting_centerPos,)
+def set_robot_start_pos(robotObj, num: int):
+    '''Set robot starting position (its own start tile if the world has one, otherwise the first)'''
+    if num < len(startTiles):
+        startingTileObj = startTiles[num]
+    else:
+        startingTileObj = startTiles[0]
 
-    robot0Obj.startingTile = startingTileObj
-    robot0Obj.lastVisitedCheckPointPosition = startingTileObj.center
-    robot0Obj.startingTile.wb_node.getField("start").setSFBool(True)
-    robot0Obj.visitedCheckpoints.append(startingTileObj.center)
+    robotObj.startingTile = startingTileObj
+    robotObj.startingTile.wb_node.getField("start").setSFBool(True)
 
-    robot0Obj.position = [startingTileObj.center[0], startingTileObj.center[1], startingTileObj.center[2]]
+    robotObj.position = [startingTileObj.center[0], startingTileObj.center[1], startingTileObj.center[2]]
 
 # -------------------------------
 # CODED LOADED BEFORE GAME STARTS
 
 if __name__ == '__main__':
 
-    uploader = threading.Thread(target=ControllerUploader.start)
-    uploader.setDaemon(True)
-    uploader.start()
+    # Run a match without the robot window (for batch evaluation)
+    headless = isHeadless()
+
+    # Controllers are uploaded through the robot window
+    if not headless:
+        uploader = threading.Thread(target=ControllerUploader.start)
+        uploader.setDaemon(True)
+        uploader.start()
 
     # Empty list to contain checkpoints
     checkpoints = []
     # Empty list to contain swamps
     swamps = []
+    # Empty list to contain traps
+    traps = []
     # Global empty list to contain human objects
     humans = []
+    # Empty list to contain start tiles
+    startTiles = []
+
+    # Read the world from its sidecar file if it is up to date (otherwise from the world's nodes)
+    worldModel = WorldParser.loadSidecar(supervisor.getWorldPath())
+
+    if worldModel is not None:
+        numberOfHumans = worldModel.numberOfVictims()
+        numberOfCheckpoints = worldModel.numberOfBounds("checkpoint")
+        numberOfSwamps = worldModel.numberOfBounds("swamp")
+        numberOfTraps = worldModel.numberOfBounds("trap")
+        numberOfStarts = worldModel.numberOfBounds("start")
+    else:
+        # Get number of humans in map
+        numberOfHumans = supervisor.getFromDef('HUMANGROUP').getField("children").getCount()
 
-    # Get number of humans in map
-    numberOfHumans = supervisor.getFromDef('HUMANGROUP').getField("children").getCount()
+        # Get number of checkpoints in map
+        numberOfCheckpoints = supervisor.getFromDef('CHECKPOINTBOUNDS').getField('children').getCount()
 
-    # Get number of checkpoints in map
-    numberOfCheckpoints = supervisor.getFromDef('CHECKPOINTBOUNDS').getField('children').getCount()
+        # Get number of swamps in map
+        numberOfSwamps = supervisor.getFromDef('SWAMPBOUNDS').getField('children').getCount()
 
-    # Get number of swamps in map
-    numberOfSwamps = supervisor.getFromDef('SWAMPBOUNDS').getField('children').getCount()
+        # Get number of traps in map
+        numberOfTraps = supervisor.getFromDef('TRAPBOUNDS').getField('children').getCount()
+
+        # Get number of start tiles in map
+        numberOfStarts = supervisor.getFromDef('STARTBOUNDS').getField('children').getCount()
 
     #get swamps in world
     getSwamps(swamps, numberOfSwamps)
 
+    #get traps in world
+    getTraps(traps, numberOfTraps)
+
     #get checkpoints in world
     getCheckpoints(checkpoints, numberOfCheckpoints)
 
     #get humans in world
     getHumans(humans, numberOfHumans)
 
+    #get start tiles in world
+    getStartTiles(startTiles, numberOfStarts)
+
+    # Index the special tiles by tile position so the robot's tile is a single lookup
+    tileGrid = SpatialGrid.TileGrid(checkpoints + swamps + traps + startTiles)
+
+    # Bucket the victims by tile so scoring only tests the ones near the robot
+    victimGrid = SpatialGrid.VictimGrid(humans, tileGrid.tileSize, tileGrid.origin, Human.radius)
+
     # Not currently running the match
     currentlyRunning = False
     previousRunState = False
@@ -561,21 +792,39 @@ if __name__ == '__main__':
     # The game has not yet started
     gameStarted = False
 
-    # Get the robot nodes by their DEF names
-    robot0 = supervisor.getFromDef("ROBOT0")
+    # Robots in the match (ROBOT0, ROBOT1... in the world or in the nodes dir)
+    numberOfRobots = countRobots()
+
+    # One receiver per robot, each on the robot's own channel
+    receivers = [getReceiver(i) for i in range(numberOfRobots)]
+
+    # Without its own receiver a robot's packets would be scored as another robot's
+    missingReceivers = [getReceiverName(i) for i in range(numberOfRobots) if receivers[i] is None]
+    if len(missingReceivers) > 0:
+        print("Can't start a match with " + str(numberOfRobots) + " robots, the supervisor has no receiver named " + ", ".join(missingReceivers))
+        if headless:
+            supervisor.simulationQuit(1)
+        sys.exit(1)
 
-    # Add robot into world
-    add_robot()
+    # Binary log of the match's events and trace of the robots' poses (opened once the robots are in place)
+    matchLog = None
+    poseTrace = None
+    lastMatchLogPath = None
 
-    # Init both robots as objects to hold their info
-    robot0Obj = Robot(robot0)
+    # Histories left by a match that stopped before its log was written
+    find_staged_histories()
+
+    # Add the robots into the world at their start tiles, with the engine scoring them
+    create_robots()
 
     # The simulation is running
     simulationRunning = True
     finished = False
 
-    # Reset the controllers
-    resetControllerFile(0)
+    # Reset the controllers (a headless match uses the controller already in place)
+    if not headless:
+        for i in range(numberOfRobots):
+            resetControllerFile(i)
 
     # How long the game has been running for
     timeElapsed = 0
@@ -587,192 +836,75 @@ if __name__ == '__main__':
     # For checking the first update with the game running
     first = True
 
-    receiver = supervisor.getReceiver('receiver')
-    receiver.enable(32)
+    # Sends the scores, time and robot 0's history to the robot window
+    publisher = WindowPublisher(robots[0].history, numberOfRobots)
+
+    # Number of steps and wall time taken by the match
+    steps = 0
+    wallStart = time.monotonic()
 
-    # Set robots starting position in world
-    set_robot_start_pos()
+    # Times each phase of the loop (if enabled)
+    phaseTimer = PhaseTimer.PhaseTimer(PROFILE_PHASES, isProfiling())
+
+    # Steps the simulation takes between updates (tiles crossed in between are still scored)
+    tick = getTick()
+
+    open_match_log()
+
+    if headless:
+        # Start straight away and run as fast as possible
+        currentlyRunning = True
+        gameStarted = True
+        lastTime = supervisor.getTime()
+        supervisor.simulationSetMode(Supervisor.SIMULATION_MODE_FAST)
 
 
     # -------------------------------
 
     # Until the match ends (also while paused)
     while simulationRunning:
-        r0 = False
-        r0s = False
+        phaseTimer.begin()
 
         # The first frame of the game running only
         if first and currentlyRunning:
             # Restart controller code
-            robot0.restartController()
+            for robotObj in robots:
+                if robotObj.inSimulation:
+                    robotObj.wb_node.restartController()
             first = False
 
-        # Test if the robots are in checkpoints
-        for checkpoint in checkpoints:
-            if robot0Obj.inSimulation:
-                # Check position of checkpoint with the robots position
-                if checkpoint.checkPosition(robot0Obj.position):
-                    r0 = True
-                    # Update the robot's last visited position
-                    robot0Obj.lastVisitedCheckPointPosition = checkpoint.center
-
-                    alreadyVisited = False
-
-                    # Dont update if checkpoint is already visited
-                    # TODO could change this to edit webots node to reduce compute time
-                    if len(robot0Obj.visitedCheckpoints) > 0:
-                        for visitedCheckpoint in robot0Obj.visitedCheckpoints:
-                            if visitedCheckpoint == checkpoint.center:
-                                alreadyVisited = True
-
-                    # Update robot's points and history
-                    if not alreadyVisited:
-                        robot0Obj.visitedCheckpoints.append(checkpoint.center)
-                        robot0Obj.increaseScore(10)
-                        robot0Obj.history.enqueue("Found checkpoint  +10")
-                        updateHistory()
-
-        # Print when robot0 enters or exits a checkpoint
-        # Not really needed
-        if robot0Obj.inSimulation:
-            if robot0Obj.inCheckpoint != r0:
-                robot0Obj.inCheckpoint = r0
-                if robot0Obj.inCheckpoint:
-                    print("Robot 0 entered a checkpoint")
-                else:
-                    print("Robot 0 exited a checkpoint")
-
-        # Check if the robots are in swamps
-        for swamp in swamps:
-            if robot0Obj.inSimulation:
-                if swamp.checkPosition(robot0Obj.position):
-                    r0s = True
-
-        # Check if robot is in swamp
-        if robot0Obj.inSimulation:
-            if robot0Obj.inSwamp != r0s:
-                robot0Obj.inSwamp = r0s
-                if robot0Obj.inSwamp:
-                    # Cap the robot's velocity to 2
-                    robot0Obj.setMaxVelocity(2)
-                    # Update history
-                    robot0Obj.history.enqueue("Entered swamp")
-                    updateHistory()
-                else:
-                    # If not in swamp, reset max velocity to default
-                    robot0Obj.setMaxVelocity(DEFAULT_MAX_VELOCITY)
-
-        # If receiver has got a message
-        if receiver.getQueueLength() > 0:
-            # Get receiver data
-            receivedData = receiver.getData()
-            try:
-                # Unpack data
-                tup = struct.unpack('i i c', receivedData)
-
-                # Get data in format (est. x position, est. z position, est. victim type)
-                x = tup[0]
-                z = tup[1]
-
-                estimated_victim_position = (x / 100, 0, z / 100)
-
-                victimType = tup[2].decode("utf-8")
-
-
-                if robot0Obj.inSimulation:
-                    # Store data recieved
-                    robot0Obj.message = [estimated_victim_position, victimType]
-            except:
-                print("Incorrect data format sent")
-
-            receiver.nextPacket()
-
-        if robot0Obj.inSimulation:
-            # If data sent to receiver
-            if robot0Obj.message != []:
-
-                r0_exitmessage = robot0Obj.message[1]
-
-                # If exit message is correct
-                if r0_exitmessage == 'E':
-
-                    robot0Obj.message = []
-
-                    # Check robot position is on starting tile
-                    if robot0Obj.startingTile.checkPosition(robot0Obj.position):
-
-                        # Update score and history
-                        robot_quit(robot0Obj, 0, False)
-                        updateHistory()
-
-                        robot0Obj.increaseScore(10)
-                        robot0Obj.increaseScore(int(robot0Obj.getScore() * 0.1))
-
-
-        if robot0Obj.inSimulation:
-            # If robot stopped for 3 seconds
-            if robot0Obj.timeStopped() >= 3:
-
-                # If messaged sent
-                if robot0Obj.message != []:
-
-                    # Get estimated values
-                    r0_est_vic_pos = robot0Obj.message[0]
-                    r0_est_vic_type = robot0Obj.message[1]
-                    robot0Obj.message = []
-
-                    # For each human
-                    # TODO optimise
-                    for i, h in enumerate(humans):
-                        # If not already identified
-                        if not h.identified:
-                            # Check if in range
-                            if h.checkPosition(robot0Obj.position):
-                                # Check if estimated position is in range
-                                if h.checkPosition(r0_est_vic_pos):
-                                    # If robot on same side
-                                    if h.onSameSide(robot0Obj.position):
-
-                                        # Get points scored depending on the type of victim
-                                        pointsScored = h.scoreWorth
-
-                                        # Update score and history
-                                        if r0_est_vic_type.lower() == h.simple_victim_type.lower():
-                                            robot0Obj.history.enqueue("Successful Victim Type Correct Bonus  + 10")
-                                            pointsScored += 10
-
-                                        robot0Obj.history.enqueue("Successful Victim Identification " + " +" + str(h.scoreWorth))
-                                        robot0Obj.increaseScore(pointsScored)
-
-                                        h.identified = True
-                                        updateHistory()
-                                else:
-                                    robot0Obj.history.enqueue("Misidentification of victim  - 5")
-                                    robot0Obj.increaseScore(-5)
-
-                                    updateHistory()
-
-        if robot0Obj.inSimulation:
-            # Relocate robot if stationary for 20 sec
-            if robot0Obj.timeStopped() >= 20:
-                relocate(robot0Obj)
-                robot0Obj.robot_timeStopped = 0
-                robot0Obj.stopped = False
-                robot0Obj.stoppedTime = None
-
-            if robot0Obj.position[1] < -0.035 and currentlyRunning:
-                relocate(robot0Obj)
-                robot0Obj.robot_timeStopped = 0
-                robot0Obj.stopped = False
-                robot0Obj.stoppedTime = None
-
-        if currentlyRunning:
-            # Check if robot has not left the starting tile
-            if not robot0Obj.left_exit_tile:
-                # Check robot position is on starting tile
-                if not robot0Obj.startingTile.checkPosition(robot0Obj.position):
-                    robot0Obj.left_exit_tile = True
-                    robot0Obj.startingTile.wb_node.getField("start").setSFBool(False)
+        # Read every packet received since the last step from each robot, in the order they were sent
+        messages = [[] for robotObj in robots]
+        for i, receiver in enumerate(receivers):
+            while receiver.getQueueLength() > 0:
+                # Get receiver data
+                receivedData = receiver.getData()
+                receiver.nextPacket()
+                try:
+                    # Unpack data in format (est. x position, est. z position, est. victim type)
+                    x, z, victimType = packetFormat.unpack(receivedData)
+                    estimated_victim_position = (x / 100, 0, z / 100)
+                    messages[i].append([estimated_victim_position, victimType.decode("utf-8")])
+                except:
+                    print("Incorrect data format sent")
+        phaseTimer.mark("receiver")
+
+        # Read the state of the robots still in the match once for this step
+        for robotObj in robots:
+            if robotObj.inSimulation:
+                robotObj.updateSnapshot()
+        phaseTimer.mark("snapshot")
+
+        # Record the poses while the match is running
+        if poseTrace is not None and currentlyRunning and not finished:
+            poseTrace.record(supervisor.getTime(), [robotObj.snapshot if robotObj.inSimulation else None for robotObj in robots])
+        phaseTimer.mark("trace")
+
+        # Score every robot in one pass
+        events = scoring.step(supervisor.getTime(), [robotObj.snapshot.position for robotObj in robots], [robotObj.snapshot.velocity for robotObj in robots], messages, currentlyRunning)
+        phaseTimer.mark("scoring")
+        applyEvents(events)
+        phaseTimer.mark("events")
 
 
         # If the running state changes
@@ -797,45 +929,90 @@ if __name__ == '__main__':
                     # Pause the match
                     currentlyRunning = False
                 if parts[0] == "reset":
-                    # Reset both controller files
-                    resetControllerFile(0)
+                    #write log for the match so far if it ran for more than 0 seconds
+                    logWritten = True
+                    if timeElapsed > 0:
+                        logWritten = write_log()
+                    close_histories(logWritten)
+                    close_match_log()
+
+                    # Reset the controller files
+                    for i in range(numberOfRobots):
+                        resetController(i)
                     resetVictimsTextures()
 
-                    # Reset the simulation
+                    # Reset the simulation (this supervisor keeps running), it takes effect at the end of the next step
                     supervisor.simulationReset()
-                    simulationRunning = False
-                    finished = True
-                    # Restart this supervisor
-                    mainSupervisor.restartController()
-                    #Show start tile
-                    robot0Obj.startingTile.wb_node.getField("start").setSFBool(True)
-
-                if parts[0] == "robot0Unload":
-                    # Unload the robot 0 controller
-                    if not gameStarted:
-                        resetController(0)
+                    if supervisor.step(32 * tick) == -1:
+                        simulationRunning = False
+                        continue
+
+                    # Drop the packets sent before the reset
+                    for receiver in receivers:
+                        while receiver.getQueueLength() > 0:
+                            receiver.nextPacket()
+
+                    # Clear the match, the tiles and victims read at startup are kept
+                    create_robots()
+                    open_match_log()
+                    publisher = WindowPublisher(robots[0].history, numberOfRobots)
+
+                    currentlyRunning = False
+                    previousRunState = False
+                    gameStarted = False
+                    first = True
+                    finished = False
+                    timeElapsed = 0
+                    lastTime = -1
+                    steps = 0
+                    wallStart = time.monotonic()
+                    phaseTimer = PhaseTimer.PhaseTimer(PROFILE_PHASES, isProfiling())
+
+                    # Enable the robot window controls for the next match
+                    windowSend("startup")
+
+                for i in range(numberOfRobots):
+                    if parts[0] == "robot"+str(i)+"Unload":
+                        # Unload the robot's controller
+                        if not gameStarted:
+                            resetController(i)
 
                 if parts[0] == 'relocate':
                     data = message.split(",", 1)
                     if len(data) > 1:
-                        if int(data[1]) == 0:
-                            relocate(robot0Obj)
+                        if int(data[1]) < numberOfRobots:
+                            applyEvents(scoring.relocate(int(data[1])))
 
                 if parts[0] == 'quit':
                     data = message.split(",", 1)
                     if len(data) > 1:
-                        if int(data[1]) == 0:
+                        if int(data[1]) < numberOfRobots:
                             if gameStarted:
-                                robot_quit(robot0Obj, 0, True)
-                        updateHistory()
-
-        # Send the update information to the robot window
-        supervisor.wwiSendText("update," + str(robot0Obj.getScore()) + "," + str(timeElapsed))
+                                applyEvents(scoring.quit(int(data[1]), True))
+
+                if parts[0] == 'profile':
+                    # Print the time taken by each phase of the loop so far
+                    if phaseTimer.enabled:
+                        print(phaseTimer.report())
+                    else:
+                        print("Profiling is off (set RESCUEMAZE_PROFILE=1)")
+
+        # Send the update information to the robot window (if due)
+        publisher.setField("score", scoring.getScore(0))
+        for i in range(1, numberOfRobots):
+            publisher.setField("score"+str(i), scoring.getScore(i))
+        publisher.setField("time", int(timeElapsed))
+        publisher.publish()
 
         # If the time is up
         if timeElapsed >= maxTime:
             finished = True
-            supervisor.wwiSendText("ended")
+            publisher.publish(True)
+            windowSend("ended")
+        # Write the buffered match log records if they are due
+        if matchLog is not None:
+            matchLog.poll()
+        phaseTimer.mark("window")
 
         # If the match is running
         if currentlyRunning and not finished:
@@ -846,13 +1023,34 @@ if __name__ == '__main__':
             # Get the current time
             lastTime = supervisor.getTime()
             # Step the simulation on
-            step = supervisor.step(32)
+            step = supervisor.step(32 * tick)
+            steps += 1
+            phaseTimer.mark("step")
             # If the simulation is terminated or the time is up
             if step == -1:
                 # Stop simulating
                 simulationRunning = False
                 finished = True
 
+        # A headless match is over once the time is up or every robot has exited
+        if headless and (finished or not any(robotObj.inSimulation for robotObj in robots)):
+            simulationRunning = False
+
+        logWritten = True
         if not simulationRunning and timeElapsed > 0:
             #write log for game if the game ran for more than 0 seconds
-            write_log()
+            logWritten = write_log()
+
+        if not simulationRunning:
+            if matchLog is not None:
+                lastMatchLogPath = os.path.splitext(matchLog.path)[0]
+            close_match_log()
+
+        if not simulationRunning and headless:
+            # Record the result and close Webots
+            write_result(time.monotonic() - wallStart, steps)
+            supervisor.simulationQuit(0)
+
+        if not simulationRunning:
+            #the staged histories are kept if they aren't in a log
+            close_histories(logWritten)
@@ -0,0 +1,193 @@
+"""Match Log v1
+
+Append-only binary log of the events of a match, written while the match runs
+so a crash loses at most the last batch of events.
+
+The file starts with a magic string and version, followed by one record per
+event. Each record is its length then a fixed part (sim time, wall time,
+points, robot and robot pose) and the event's kind and history text. A record
+cut short by a crash is ignored when the file is read.
+
+Features:
+ - Records packed into a buffer and written in batches (by count or by time)
+ - Reader that memory maps the file and unpacks the records in place
+ - Start and end of match records (world, robot names and final scores)
+ - Command line dump of log files
+"""
+
+import json
+import mmap
+import os
+import struct
+import sys
+import time
+
+MAGIC = b"RMLOG\x00"
+VERSION = 1
+
+# Magic string and version at the start of the file
+FILE_HEADER = struct.Struct("<6sH")
+# Length of the record that follows
+RECORD_LENGTH = struct.Struct("<I")
+# Sim time, wall time, points, robot, robot x, y and z, length of the kind
+RECORD = struct.Struct("<ddiB3dB")
+
+# Kinds of the records written by the log itself (the rest are score event kinds)
+MATCH_START = "matchStart"
+MATCH_END = "matchEnd"
+
+# Records buffered before they are written
+BATCH_SIZE = 64
+# Maximum wall time (seconds) a record is buffered for
+FLUSH_INTERVAL = 1.0
+
+
+class MatchEvent():
+    '''An event read from a match log'''
+
+    __slots__ = ("simTime", "wallTime", "points", "robot", "pose", "kind", "text")
+
+    def __init__(self, simTime: float, wallTime: float, points: int, robot: int, pose: tuple, kind: str, text: str):
+        self.simTime = simTime
+        self.wallTime = wallTime
+        # Change made to the robot's score (the final score for a match end)
+        self.points = points
+        self.robot = robot
+        # Robot position [x, y, z] when the event happened
+        self.pose = pose
+        self.kind = kind
+        # History text of the event ("" if it has none)
+        self.text = text
+
+    def toDict(self) -> dict:
+        return {"simTime": self.simTime, "wallTime": self.wallTime, "points": self.points, "robot": self.robot,
+                "pose": list(self.pose), "kind": self.kind, "text": self.text}
+
+
+class MatchLog():
+    '''Writes the events of a match to a log file in batches'''
+
+    def __init__(self, path: str, batchSize=BATCH_SIZE, flushInterval=FLUSH_INTERVAL) -> None:
+        '''Create the log file (replacing any file at the path)'''
+        self.path = path
+        self.batchSize = batchSize
+        self.flushInterval = flushInterval
+        # Records packed since the last write
+        self.buffer = bytearray()
+        self.pending = 0
+        self.lastFlush = time.monotonic()
+
+        self.file = open(path, "wb")
+        self.file.write(FILE_HEADER.pack(MAGIC, VERSION))
+        self.file.flush()
+
+    def append(self, simTime: float, kind: str, points=0, robot=0, pose=(0, 0, 0), text=None) -> None:
+        '''Add an event to the log (written with the next batch)'''
+        kindBytes = kind.encode("utf-8")
+        textBytes = text.encode("utf-8") if text is not None else b""
+        length = RECORD.size + len(kindBytes) + len(textBytes)
+
+        self.buffer += RECORD_LENGTH.pack(length)
+        self.buffer += RECORD.pack(simTime, time.time(), points, robot, pose[0], pose[1], pose[2], len(kindBytes))
+        self.buffer += kindBytes
+        self.buffer += textBytes
+
+        self.pending += 1
+        if self.pending >= self.batchSize:
+            self.flush()
+
+    def poll(self) -> None:
+        '''Write the buffered records if they have been held for long enough'''
+        if self.pending > 0 and time.monotonic() - self.lastFlush >= self.flushInterval:
+            self.flush()
+
+    def flush(self) -> None:
+        '''Write the buffered records to the file'''
+        if self.file is None:
+            return
+        if self.pending > 0:
+            self.file.write(self.buffer)
+            # Hand the batch to the OS so it survives the process crashing
+            self.file.flush()
+            self.buffer = bytearray()
+            self.pending = 0
+        self.lastFlush = time.monotonic()
+
+    def close(self) -> None:
+        '''Write the remaining records and close the file'''
+        if self.file is not None:
+            self.flush()
+            self.file.close()
+            self.file = None
+
+
+class MatchLogReader():
+    '''Reads the events of a match log through a memory map of the file'''
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self.file = open(path, "rb")
+        size = os.fstat(self.file.fileno()).st_size
+        if size < FILE_HEADER.size:
+            self.file.close()
+            raise ValueError("Not a match log: " + path)
+        self.data = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version = FILE_HEADER.unpack_from(self.data, 0)
+        if magic != MAGIC or version != VERSION:
+            self.close()
+            raise ValueError("Not a match log (or an unknown version): " + path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    def __iter__(self):
+        '''Iterate over the events in the order they were written'''
+        data = self.data
+        size = len(data)
+        offset = FILE_HEADER.size
+        while offset + RECORD_LENGTH.size <= size:
+            length = RECORD_LENGTH.unpack_from(data, offset)[0]
+            start = offset + RECORD_LENGTH.size
+            # A record cut short by a crash ends the log
+            if length < RECORD.size or start + length > size:
+                break
+            simTime, wallTime, points, robot, x, y, z, kindLength = RECORD.unpack_from(data, start)
+            kindStart = start + RECORD.size
+            textStart = kindStart + kindLength
+            kind = data[kindStart:textStart].decode("utf-8")
+            text = data[textStart:start + length].decode("utf-8")
+            yield MatchEvent(simTime, wallTime, points, robot, (x, y, z), kind, text)
+            offset = start + length
+
+    def close(self) -> None:
+        if self.data is not None:
+            self.data.close()
+            self.data = None
+        self.file.close()
+
+
+def readLog(path: str) -> list:
+    '''Read all the events of a match log'''
+    with MatchLogReader(path) as reader:
+        return list(reader)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("Usage: python MatchLog.py [--json] match.rmlog [match.rmlog ...]")
+        sys.exit(1)
+
+    if sys.argv[1] == "--json":
+        # Print each event as a line of JSON
+        for logPath in sys.argv[2:]:
+            for event in readLog(logPath):
+                print(json.dumps(event.toDict()))
+    else:
+        for logPath in sys.argv[1:]:
+            print(logPath)
+            for event in readLog(logPath):
+                print("  {:8.3f}  robot {}  {:<20} {:>4}  {}".format(event.simTime, event.robot, event.kind, event.points, event.text))
@@ -0,0 +1,96 @@
+"""Phase Timer v1
+
+Optional timing of the phases of the supervisor's main loop. Each phase has a
+fixed size histogram of its wall time per step, so recording costs the same
+however long the match runs.
+
+Features:
+ - Power of two histogram buckets from 1 microsecond to over a minute
+ - Report with the count, mean, median, 99th percentile and maximum of each phase
+ - Does nothing (beyond a call) when disabled
+"""
+
+import array
+import time
+
+# Number of histogram buckets, bucket i holds times from 2^(i-1) up to 2^i microseconds
+NUMBER_OF_BUCKETS = 28
+
+
+class PhaseHistogram():
+    '''Histogram of the times taken by one phase'''
+
+    def __init__(self) -> None:
+        self.buckets = array.array('L', bytes(array.array('L').itemsize * NUMBER_OF_BUCKETS))
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, seconds: float) -> None:
+        '''Record a time taken'''
+        micro = int(seconds * 1000000)
+        self.buckets[min(micro.bit_length(), NUMBER_OF_BUCKETS - 1)] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def percentile(self, fraction: float) -> float:
+        '''Get the upper bound (seconds) of the bucket holding the given fraction of the times'''
+        target = fraction * self.count
+        seen = 0
+        for i in range(NUMBER_OF_BUCKETS):
+            seen += self.buckets[i]
+            if seen >= target and seen > 0:
+                return min((1 << i) / 1000000, self.max)
+        return self.max
+
+
+class PhaseTimer():
+    '''Records the wall time between marks into a histogram per phase'''
+
+    def __init__(self, phases: list, enabled=True) -> None:
+        '''Create a timer for the named phases (in the order they happen in the loop)'''
+        self.enabled = enabled
+        self.phases = phases
+        self.histograms = {}
+        for phase in phases:
+            self.histograms[phase] = PhaseHistogram()
+        self.last = time.perf_counter()
+
+    def begin(self) -> None:
+        '''Start timing a step of the loop'''
+        if self.enabled:
+            self.last = time.perf_counter()
+
+    def mark(self, phase: str) -> None:
+        '''End a phase, the time since the last mark is added to its histogram'''
+        if self.enabled:
+            now = time.perf_counter()
+            self.histograms[phase].add(now - self.last)
+            self.last = now
+
+    def toDict(self) -> dict:
+        '''Get the statistics of each phase (times in seconds)'''
+        stats = {}
+        for phase in self.phases:
+            h = self.histograms[phase]
+            stats[phase] = {
+                "count": h.count,
+                "total": h.total,
+                "mean": h.total / h.count if h.count > 0 else 0,
+                "p50": h.percentile(0.5),
+                "p99": h.percentile(0.99),
+                "max": h.max,
+                "buckets": h.buckets.tolist(),
+            }
+        return stats
+
+    def report(self) -> str:
+        '''Create a table of the statistics of each phase (times in microseconds)'''
+        lines = ["{:<10}{:>10}{:>10}{:>10}{:>10}{:>10}{:>10}".format("phase", "count", "mean", "p50", "p99", "max", "total s")]
+        for phase, stats in self.toDict().items():
+            lines.append("{:<10}{:>10}{:>10.1f}{:>10.0f}{:>10.0f}{:>10.0f}{:>10.3f}".format(
+                phase, stats["count"], stats["mean"] * 1000000, stats["p50"] * 1000000,
+                stats["p99"] * 1000000, stats["max"] * 1000000, stats["total"]))
+        return "\n".join(lines) + "\n"
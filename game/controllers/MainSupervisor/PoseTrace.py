@@ -0,0 +1,191 @@
+"""Pose Trace v1
+
+Records the pose of every robot at every step of a match into a fixed width
+file of float32 values, so trajectories can be replayed, drawn and re-scored
+after the match.
+
+The file is a header followed by one row per sample: the sim time then the
+position, rotation and velocity of each robot. It is created at its full size
+for the length of the match and written through a memory map, so a sample is a
+single pack into the map. The header holds the number of samples written, and
+the file is cut to that size when the trace is closed.
+
+Features:
+ - Preallocated, memory mapped file written without growing or copying
+ - Robots not in the match recorded as NaN
+ - Reader giving each column as a view of the file (no copying)
+ - Command line summary of trace files (samples, duration, distance travelled)
+"""
+
+import math
+import mmap
+import os
+import struct
+import sys
+
+MAGIC = b"RMPOSE"
+VERSION = 1
+
+# Magic string, version, number of robots, values per robot, capacity, samples written, seconds per sample
+HEADER = struct.Struct("<6sHHHIIf8x")
+# Offset of the number of samples written, updated with every sample
+COUNT = struct.Struct("<I")
+COUNT_OFFSET = 16
+
+# Values recorded for each robot, in the order they are in a row
+ROBOT_COLUMNS = ["x", "y", "z", "axisX", "axisY", "axisZ", "angle", "vx", "vy", "vz", "wx", "wy", "wz"]
+ROBOT_WIDTH = len(ROBOT_COLUMNS)
+
+# Values of a robot not in the match
+NAN_ROBOT = [math.nan] * ROBOT_WIDTH
+
+
+def rowFormat(numberOfRobots: int) -> struct.Struct:
+    '''Get the format of a row (the time then the values of each robot)'''
+    return struct.Struct("<" + "f" * (1 + ROBOT_WIDTH * numberOfRobots))
+
+
+class PoseTrace():
+    '''Writes the poses of the robots in a match to a trace file'''
+
+    def __init__(self, path: str, numberOfRobots: int, capacity: int, timestep: float) -> None:
+        '''Create a trace file with room for capacity samples (replacing any file at the path)'''
+        self.path = path
+        self.numberOfRobots = numberOfRobots
+        self.capacity = capacity
+        self.row = rowFormat(numberOfRobots)
+        self.count = 0
+
+        # Values of the row being written, reused for every sample
+        self.values = [0.0] * (1 + ROBOT_WIDTH * numberOfRobots)
+
+        self.file = open(path, "w+b")
+        self.file.truncate(HEADER.size + capacity * self.row.size)
+        self.data = mmap.mmap(self.file.fileno(), 0)
+        HEADER.pack_into(self.data, 0, MAGIC, VERSION, numberOfRobots, ROBOT_WIDTH, capacity, 0, timestep)
+
+    def record(self, time: float, snapshots: list) -> bool:
+        '''Add a sample from the robot snapshots (objects with a position, rotation and velocity, None for a robot not in the match), returns false if the trace is full'''
+        if self.data is None or self.count >= self.capacity:
+            return False
+
+        values = self.values
+        values[0] = time
+        i = 1
+        for snapshot in snapshots:
+            if snapshot is None:
+                values[i:i + ROBOT_WIDTH] = NAN_ROBOT
+            else:
+                values[i:i + 3] = snapshot.position
+                values[i + 3:i + 7] = snapshot.rotation
+                values[i + 7:i + 13] = snapshot.velocity
+            i += ROBOT_WIDTH
+
+        self.row.pack_into(self.data, HEADER.size + self.count * self.row.size, *values)
+        self.count += 1
+        COUNT.pack_into(self.data, COUNT_OFFSET, self.count)
+        return True
+
+    def close(self) -> None:
+        '''Close the trace, cutting the file to the samples written'''
+        if self.data is None:
+            return
+        self.data.flush()
+        self.data.close()
+        self.data = None
+        self.file.truncate(HEADER.size + self.count * self.row.size)
+        self.file.close()
+
+
+class PoseTraceReader():
+    '''Reads a trace file through a memory map, giving the columns as views of the file'''
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self.file = open(path, "rb")
+        size = os.fstat(self.file.fileno()).st_size
+        if size < HEADER.size:
+            self.file.close()
+            raise ValueError("Not a pose trace: " + path)
+        self.data = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, self.numberOfRobots, columnsPerRobot, self.capacity, count, self.timestep = HEADER.unpack_from(self.data, 0)
+        if magic != MAGIC or version != VERSION or columnsPerRobot != ROBOT_WIDTH:
+            self.close()
+            raise ValueError("Not a pose trace (or an unknown version): " + path)
+
+        # Number of float32 values in a row
+        self.width = 1 + ROBOT_WIDTH * self.numberOfRobots
+        # Only whole rows in the file count (the file may have been cut short)
+        self.count = min(count, (size - HEADER.size) // (self.width * 4))
+        self.values = memoryview(self.data)[HEADER.size:HEADER.size + self.count * self.width * 4].cast("f")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    def __len__(self) -> int:
+        return self.count
+
+    def times(self) -> memoryview:
+        '''Get the sim time of each sample'''
+        return self.values[0::self.width]
+
+    def column(self, name: str, robot=0) -> memoryview:
+        '''Get a robot's value (one of ROBOT_COLUMNS) at each sample'''
+        return self.values[1 + robot * ROBOT_WIDTH + ROBOT_COLUMNS.index(name)::self.width]
+
+    def row(self, index: int) -> memoryview:
+        '''Get all the values of a sample'''
+        return self.values[index * self.width:(index + 1) * self.width]
+
+    def close(self) -> None:
+        '''Close the file (views still held keep the map open until they are released)'''
+        if self.data is None:
+            return
+        self.values.release()
+        try:
+            self.data.close()
+        except BufferError:
+            pass
+        self.data = None
+        self.file.close()
+
+
+def distanceTravelled(reader: PoseTraceReader, robot=0) -> float:
+    '''Get the distance a robot moved across the floor over a trace'''
+    xs = reader.column("x", robot)
+    zs = reader.column("z", robot)
+    distance = 0.0
+    lastX = lastZ = None
+    for x, z in zip(xs, zs):
+        # Samples while the robot is out of the match are skipped
+        if math.isnan(x):
+            continue
+        if lastX is not None:
+            distance += math.hypot(x - lastX, z - lastZ)
+        lastX, lastZ = x, z
+    return distance
+
+
+def printSummary(path: str) -> None:
+    '''Print the length of a trace and the distance each robot travelled'''
+    with PoseTraceReader(path) as reader:
+        times = reader.times()
+        duration = times[-1] - times[0] if len(reader) > 0 else 0
+        print(path)
+        print("  samples: {} of {}  ({:.1f}s, {:.0f}ms per sample)".format(len(reader), reader.capacity, duration, reader.timestep * 1000))
+        for robot in range(reader.numberOfRobots):
+            print("  robot {}: {:.2f}m travelled".format(robot, distanceTravelled(reader, robot)))
+        del times
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("Usage: python PoseTrace.py trace.rmpose [trace.rmpose ...]")
+        sys.exit(1)
+
+    for tracePath in sys.argv[1:]:
+        printSummary(tracePath)
@@ -0,0 +1,420 @@
+"""Scoring Engine v1
+
+The rules used to score the robots in a match, kept apart from Webots so
+matches can be scored (and re-scored) without the simulator.
+
+Each step the engine is given each robot's pose and the messages it sent, it
+returns the score events that happened. Applying the events to the world
+(moving the robot, capping its speed, marking victims as found) is left to the
+supervisor.
+
+Features:
+ - Checkpoint, swamp, victim, lack of progress and exit rules
+ - Tiles passed through between two steps count, so the engine can be stepped less often
+ - Tile and victim objects shared with the supervisor
+ - Any number of robots, their state held in one array per value
+"""
+
+import array
+
+from SpatialGrid import facingNormal
+
+# Time (seconds) the robot must be stopped for a victim report to be scored
+IDENTIFY_TIME = 3
+# Time (seconds) the robot can be stopped before it is relocated
+RELOCATE_TIME = 20
+# Height the robot is below when it has fallen into a trap
+FALL_HEIGHT = -0.035
+# Maximum velocity of a robot in a swamp
+SWAMP_VELOCITY = 2
+
+# Kinds of score event
+FOUND_CHECKPOINT = "foundCheckpoint"
+ENTERED_CHECKPOINT = "enteredCheckpoint"
+LEFT_CHECKPOINT = "leftCheckpoint"
+ENTERED_SWAMP = "enteredSwamp"
+LEFT_SWAMP = "leftSwamp"
+VICTIM_TYPE_BONUS = "victimTypeBonus"
+IDENTIFIED_VICTIM = "identifiedVictim"
+MISIDENTIFIED_VICTIM = "misidentifiedVictim"
+LACK_OF_PROGRESS = "lackOfProgress"
+RELOCATED = "relocated"
+EXITED = "exited"
+EXIT_BONUS = "exitBonus"
+LEFT_START = "leftStart"
+
+
+class Tile():
+    '''Tile object holding the boundaries'''
+
+    def __init__(self, min: list, max: list, center: list, id=None):
+        '''Initialize the maximum and minimum corners for the tile'''
+        self.min = min
+        self.max = max
+        self.center = center
+        # Index of the tile within its bounds group
+        self.id = id
+
+    def checkPosition(self, pos: list) -> bool:
+        '''Check if a position is in this checkpoint'''
+        # If the x position is within the bounds
+        if pos[0] >= self.min[0] and pos[0] <= self.max[0]:
+            # if the z position is within the bounds
+            if pos[2] >= self.min[1] and pos[2] <= self.max[1]:
+                # It is in this checkpoint
+                return True
+
+        # It is not in this checkpoint
+        return False
+
+
+class Checkpoint(Tile):
+    '''Checkpoint object holding the boundaries'''
+
+    def __init__(self, min: list, max: list, center=None, id=None):
+        super().__init__(min, max, center, id)
+
+
+class Swamp(Tile):
+    '''Swamp object holding the boundaries'''
+
+    def __init__(self, min: list, max: list, center=None, id=None):
+        super().__init__(min, max, center, id)
+
+
+class Trap(Tile):
+    '''Trap object holding the boundaries'''
+
+    def __init__(self, min: list, max: list, center=None, id=None):
+        super().__init__(min, max, center, id)
+
+
+class Victim():
+    '''Victim object holding the geometry and worth of a victim'''
+
+    # Distance the robot and estimates must be within to be near the victim
+    radius = 0.09
+
+    def __init__(self, position: list, rotation: list, ap: int, vtype: str, score: int):
+        '''Initialises the position, facing direction and worth of the victim'''
+        self.arrayPosition = ap
+        self.scoreWorth = score
+        self._victim_type = vtype
+
+        self.simple_victim_type = self.get_simple_victim_type()
+
+        self._position = position
+        self._rotation = rotation
+        # Unit vector [x, z] pointing out from the wall the victim is on
+        self.normal = facingNormal(rotation)
+
+    @property
+    def position(self) -> list:
+        return self._position
+
+    @property
+    def rotation(self) -> list:
+        return self._rotation
+
+    def get_simple_victim_type(self):
+        # Get victim type via proto node
+        if self._victim_type == 'harmed':
+            return 'H'
+        elif self._victim_type == 'unharmed':
+            return 'U'
+        elif self._victim_type == 'stable':
+            return 'S'
+        elif self._victim_type == 'Heat': # Temperature victim
+            return 'T'
+        else:
+            return self._victim_type
+
+    def checkPosition(self, pos: list) -> bool:
+        '''Check if a position is near an object, based on the radius value'''
+        # Compare squared euclidean distances to avoid the square root
+        distance = ((self._position[0] - pos[0])**2) + ((self._position[2] - pos[2])**2)
+        return distance <= self.radius**2
+
+    def onSameSide(self, pos: list) -> bool:
+        '''Check if a position is on the side of the wall the victim faces'''
+        # Positive when the position is in front of the victim
+        return (pos[0] - self._position[0]) * self.normal[0] + (pos[2] - self._position[2]) * self.normal[1] > 0
+
+
+class ScoreEvent():
+    '''Something that happened in a match'''
+
+    def __init__(self, kind: str, text=None, points=0, data=None, robot=0, scoreChange=None):
+        '''Initialise the kind of event, its history text, points and data'''
+        self.kind = kind
+        # Text for the robot's history (None if it is not recorded)
+        self.text = text
+        self.points = points
+        # Change to the robot's score once it is kept from going below 0 (the points if not given)
+        self.scoreChange = points if scoreChange is None else scoreChange
+        # Checkpoint id, victim array position or relocation position
+        self.data = data
+        # Index of the robot the event happened to
+        self.robot = robot
+
+
+class ScoringEngine():
+    '''Scores the robots in a match from their poses and messages'''
+
+    def __init__(self, tileGrid, victimGrid, startTiles: list, numberOfCheckpoints: int, numberOfVictims: int):
+        '''Initialise the match state of one robot per start tile, the grids give the tile and victims at a position'''
+        self.tileGrid = tileGrid
+        self.victimGrid = victimGrid
+        self.startTiles = startTiles
+        self.numberOfRobots = len(startTiles)
+        self.numberOfCheckpoints = numberOfCheckpoints
+        n = self.numberOfRobots
+
+        # The state of the robots is held in arrays indexed by robot (struct of arrays)
+        self.score = array.array('l', [0] * n)
+
+        # One flag per checkpoint id for each robot (robot r's flags start at r * numberOfCheckpoints)
+        self.visitedCheckpoints = bytearray(n * numberOfCheckpoints)
+        # One flag per victim array position, a victim can only be identified once in a match
+        self.identifiedVictims = bytearray(numberOfVictims)
+
+        # Where each robot is relocated to, [x, y, z] for each robot
+        self.lastVisitedCheckPointPosition = array.array('d')
+        for startTile in startTiles:
+            self.lastVisitedCheckPointPosition.extend(startTile.center)
+
+        self.inCheckpoint = bytearray(b"\x01" * n)
+        self.inSwamp = bytearray(b"\x01" * n)
+        self.left_exit_tile = bytearray(n)
+        self.inSimulation = bytearray(b"\x01" * n)
+
+        # Victim report [estimated position, estimated type] waiting for each robot to stop
+        self.message = [None] * n
+
+        # Whether each robot is stopped, the time it stopped and how long it has been stopped for
+        self.stopped = bytearray(n)
+        self.stoppedTime = array.array('d', [0.0] * n)
+        self.robot_timeStopped = array.array('d', [0.0] * n)
+
+        # Position of each robot at the last step, tiles between it and the next position are passed through
+        self.hasLastPosition = bytearray(n)
+        self.lastPosition = array.array('d', [0.0] * (3 * n))
+
+        # Events of the current call
+        self.events = []
+
+    def _addEvent(self, robot: int, kind: str, text=None, points=0, data=None) -> None:
+        '''Record an event and add its points to the robot's score (which can't go below 0)'''
+        before = self.score[robot]
+        if before + points < 0:
+            self.score[robot] = 0
+        else:
+            self.score[robot] += points
+        self.events.append(ScoreEvent(kind, text, points, data, robot, self.score[robot] - before))
+
+    def _updateTimeStopped(self, time: float, velocities: list) -> None:
+        '''Update how long each robot has been stopped for'''
+        for r in range(self.numberOfRobots):
+            velocity = velocities[r]
+            if abs(velocity[0]) < 0.01 and abs(velocity[1]) < 0.01 and abs(velocity[2]) < 0.01:
+                if self.stopped[r]:
+                    # calculate the time the robot stopped
+                    self.robot_timeStopped[r] = time - self.stoppedTime[r]
+                else:
+                    # get time the robot stopped
+                    self.stopped[r] = 1
+                    self.stoppedTime[r] = time
+            elif self.stopped[r]:
+                # if it's no longer stopped, reset variables
+                self.stopped[r] = 0
+                self.robot_timeStopped[r] = 0
+
+    def _relocate(self, robot: int) -> list:
+        '''Move a robot to its last visited checkpoint, returns its new position'''
+        i = 3 * robot
+        position = [self.lastVisitedCheckPointPosition[i], -0.03, self.lastVisitedCheckPointPosition[i + 2]]
+        # The robot is moved, not driven, so no tiles are passed through
+        self.lastPosition[i:i + 3] = array.array('d', position)
+        self.hasLastPosition[robot] = 1
+        # The stopped time starts again
+        self.stopped[robot] = 0
+        self.robot_timeStopped[robot] = 0
+        self._addEvent(robot, LACK_OF_PROGRESS, "Lack of Progress - 5", -5)
+        self._addEvent(robot, RELOCATED, "Relocating to checkpoint", data=position)
+        return position
+
+    def _quit(self, robot: int, manualExit: bool) -> None:
+        '''Remove a robot from the match'''
+        self.inSimulation[robot] = 0
+        # Whether it was manual or via exit message
+        if manualExit:
+            self._addEvent(robot, EXITED, "Manual Exit")
+        else:
+            self._addEvent(robot, EXITED, "Successful Exit")
+
+    def _updateTile(self, robot: int, tile) -> None:
+        '''Apply the rules for a robot being on a tile (None for a normal tile)'''
+        # Test if the robot is in a checkpoint
+        inCheckpoint = isinstance(tile, Checkpoint)
+        if inCheckpoint:
+            # Update the robot's last visited position
+            self.lastVisitedCheckPointPosition[3 * robot:3 * robot + 3] = array.array('d', tile.center)
+
+            # Points if the checkpoint has not been visited
+            visited = robot * self.numberOfCheckpoints + tile.id
+            if not self.visitedCheckpoints[visited]:
+                self.visitedCheckpoints[visited] = 1
+                self._addEvent(robot, FOUND_CHECKPOINT, "Found checkpoint  +10", 10, tile.id)
+
+        # When the robot enters or exits a checkpoint
+        if self.inCheckpoint[robot] != inCheckpoint:
+            self.inCheckpoint[robot] = inCheckpoint
+            self._addEvent(robot, ENTERED_CHECKPOINT if inCheckpoint else LEFT_CHECKPOINT)
+
+        # When the robot enters or exits a swamp
+        inSwamp = isinstance(tile, Swamp)
+        if self.inSwamp[robot] != inSwamp:
+            self.inSwamp[robot] = inSwamp
+            if inSwamp:
+                self._addEvent(robot, ENTERED_SWAMP, "Entered swamp")
+            else:
+                self._addEvent(robot, LEFT_SWAMP)
+
+    def _updateTiles(self, robot: int, position: list) -> bool:
+        '''Apply the rules for the tiles a robot passed through and is on, returns true if it passed off its start tile'''
+        startTile = self.startTiles[robot]
+        i = 3 * robot
+
+        # Tiles passed through on the way from the last position (there can be several between coarse steps)
+        leftStart = False
+        if self.hasLastPosition[robot]:
+            for cell in self.tileGrid.cellsOnSegment(self.lastPosition[i:i + 3], position)[1:-1]:
+                passedTile = self.tileGrid.cells.get(cell)
+                self._updateTile(robot, passedTile)
+                leftStart = leftStart or passedTile is not startTile
+        self.lastPosition[i:i + 3] = array.array('d', position)
+        self.hasLastPosition[robot] = 1
+
+        # Get the special tile the robot is on (if any)
+        self._updateTile(robot, self.tileGrid.getTile(position))
+        return leftStart
+
+    def _checkVictim(self, robot: int, position: list, message: list) -> None:
+        '''Score a victim report [estimated position, estimated type] against the victims near the robot'''
+        est_vic_pos = message[0]
+        est_vic_type = message[1]
+
+        # For each victim in range of the robot
+        for h in self.victimGrid.nearby(position):
+            # If not already identified
+            if not self.identifiedVictims[h.arrayPosition]:
+                # Check if estimated position is in range
+                if h.checkPosition(est_vic_pos):
+                    # If robot on same side
+                    if h.onSameSide(position):
+                        # Bonus if the type is correct
+                        if est_vic_type.lower() == h.simple_victim_type.lower():
+                            self._addEvent(robot, VICTIM_TYPE_BONUS, "Successful Victim Type Correct Bonus  + 10", 10, h.arrayPosition)
+
+                        # Points scored depending on the type of victim
+                        self._addEvent(robot, IDENTIFIED_VICTIM, "Successful Victim Identification " + " +" + str(h.scoreWorth), h.scoreWorth, h.arrayPosition)
+
+                        self.identifiedVictims[h.arrayPosition] = 1
+                else:
+                    self._addEvent(robot, MISIDENTIFIED_VICTIM, "Misidentification of victim  - 5", -5, h.arrayPosition)
+
+    def _processMessage(self, robot: int, position: list, message: list) -> None:
+        '''Apply a message [estimated position, estimated type] received from a robot'''
+        # If exit message is correct
+        if message[1] == 'E':
+            # The exit message replaces any report waiting for the robot to stop
+            self.message[robot] = None
+
+            # Check robot position is on starting tile
+            if self.tileGrid.getTile(position) is self.startTiles[robot]:
+                self._quit(robot, False)
+                self._addEvent(robot, EXIT_BONUS, points=10)
+                self._addEvent(robot, EXIT_BONUS, points=int(self.score[robot] * 0.1))
+
+        # If robot stopped for long enough
+        elif self.robot_timeStopped[robot] >= IDENTIFY_TIME:
+            self._checkVictim(robot, position, message)
+
+        else:
+            # Keep the latest report until the robot has stopped
+            self.message[robot] = message
+
+    def step(self, time: float, positions: list, velocities: list, messages=None, running=True) -> list:
+        '''Advance the match to a simulation time given the pose and messages of each robot, returns the events that happened'''
+        self.events = []
+        n = self.numberOfRobots
+        if messages is None:
+            messages = [()] * n
+        # Positions after any relocation this step
+        positions = list(positions)
+
+        self._updateTimeStopped(time, velocities)
+
+        # Tiles each robot passed through and is on
+        leftStart = bytearray(n)
+        for r in range(n):
+            if self.inSimulation[r]:
+                leftStart[r] = self._updateTiles(r, positions[r])
+
+        for r in range(n):
+            if not self.inSimulation[r]:
+                continue
+            # A kept report was sent before any new messages, so it is scored first
+            if self.message[r] is not None and self.robot_timeStopped[r] >= IDENTIFY_TIME:
+                message = self.message[r]
+                self.message[r] = None
+                self._checkVictim(r, positions[r], message)
+
+            # Apply the messages in the order they were sent
+            for message in messages[r]:
+                if not self.inSimulation[r]:
+                    break
+                self._processMessage(r, positions[r], message)
+
+        for r in range(n):
+            if not self.inSimulation[r]:
+                continue
+            # Relocate robot if stationary for too long
+            if self.robot_timeStopped[r] >= RELOCATE_TIME:
+                positions[r] = self._relocate(r)
+
+            # Relocate robot if it fell into a trap
+            if positions[r][1] < FALL_HEIGHT and running:
+                positions[r] = self._relocate(r)
+
+            if running:
+                # Check if robot has left the starting tile
+                if not self.left_exit_tile[r]:
+                    if leftStart[r] or self.tileGrid.getTile(positions[r]) is not self.startTiles[r]:
+                        self.left_exit_tile[r] = 1
+                        self._addEvent(r, LEFT_START)
+
+        return self.events
+
+    def relocate(self, robot: int) -> list:
+        '''Relocate a robot on request, returns the events that happened'''
+        self.events = []
+        if self.inSimulation[robot]:
+            self._relocate(robot)
+        return self.events
+
+    def getScore(self, robot: int) -> int:
+        '''Get a robot's score'''
+        return self.score[robot]
+
+    def getVisitedMask(self, robot: int) -> str:
+        '''Get the checkpoints a robot has visited as a string of 0s and 1s in checkpoint id order'''
+        start = robot * self.numberOfCheckpoints
+        return "".join("1" if visited else "0" for visited in self.visitedCheckpoints[start:start + self.numberOfCheckpoints])
+
+    def quit(self, robot: int, manualExit: bool) -> list:
+        '''Remove a robot on request, returns the events that happened'''
+        self.events = []
+        if self.inSimulation[robot]:
+            self._quit(robot, manualExit)
+        return self.events
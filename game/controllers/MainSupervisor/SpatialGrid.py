@@ -0,0 +1,133 @@
+"""Spatial Grid v1
+
+Uniform grids used by the supervisor to find what is at a position without
+scanning every object in the world.
+
+Features:
+ - Tile grid keyed by tile coordinates for the special tiles (checkpoints, swamps, traps and the start)
+ - Tiles a straight movement passes through (so positions can be sampled less often)
+ - Victim grid bucketing the victims by tile
+"""
+
+import math
+
+
+class TileGrid():
+    '''Uniform grid holding the special tiles, keyed by their tile coordinates'''
+
+    def __init__(self, tiles: list) -> None:
+        '''Build the grid from a list of tiles (objects with min and max [x, z] corners)'''
+        #Tile coordinates -> tile object
+        self.cells = {}
+        #Width of a tile and the corner the grid is aligned to
+        self.tileSize = 1.0
+        self.origin = [0.0, 0.0]
+
+        #All tiles share the same lattice, so any tile defines the grid
+        if len(tiles) > 0:
+            self.tileSize = tiles[0].max[0] - tiles[0].min[0]
+            self.origin = [tiles[0].min[0], tiles[0].min[1]]
+
+        for tile in tiles:
+            self.add(tile)
+
+    def add(self, tile) -> None:
+        '''Add a tile to the grid'''
+        #Corners lie on the lattice, rounding removes float error from the world file
+        key = (round((tile.min[0] - self.origin[0]) / self.tileSize), round((tile.min[1] - self.origin[1]) / self.tileSize))
+        self.cells[key] = tile
+
+    def cellOf(self, pos: list) -> tuple:
+        '''Get the tile coordinates containing a position [x, y, z]'''
+        return (math.floor((pos[0] - self.origin[0]) / self.tileSize), math.floor((pos[2] - self.origin[1]) / self.tileSize))
+
+    def getTile(self, pos: list):
+        '''Get the special tile at a position [x, y, z], None if it is a normal tile'''
+        return self.cells.get(self.cellOf(pos))
+
+    def cellsOnSegment(self, start: list, end: list) -> list:
+        '''Get the tile coordinates of every cell the segment between two positions [x, y, z] passes through, in order'''
+        #Positions in units of tiles
+        x = (start[0] - self.origin[0]) / self.tileSize
+        z = (start[2] - self.origin[1]) / self.tileSize
+        dx = (end[0] - self.origin[0]) / self.tileSize - x
+        dz = (end[2] - self.origin[1]) / self.tileSize - z
+
+        cell = [math.floor(x), math.floor(z)]
+        endCell = self.cellOf(end)
+        cells = [tuple(cell)]
+
+        #Step direction, distance along the segment (0 to 1) to the next cell boundary and between boundaries
+        stepX = 1 if dx > 0 else -1
+        stepZ = 1 if dz > 0 else -1
+        nextX = ((cell[0] + (stepX > 0)) - x) / dx if dx != 0 else math.inf
+        nextZ = ((cell[1] + (stepZ > 0)) - z) / dz if dz != 0 else math.inf
+        deltaX = abs(1 / dx) if dx != 0 else math.inf
+        deltaZ = abs(1 / dz) if dz != 0 else math.inf
+
+        #Walk across one boundary at a time until the end cell is reached
+        for i in range(abs(endCell[0] - cell[0]) + abs(endCell[1] - cell[1])):
+            if nextX < nextZ:
+                cell[0] += stepX
+                nextX += deltaX
+            else:
+                cell[1] += stepZ
+                nextZ += deltaZ
+            cells.append(tuple(cell))
+
+        return cells
+
+
+def facingNormal(rotation: list) -> list:
+    '''Get the [x, z] unit vector a victim with the given axis-angle rotation faces out along'''
+    #Victims face along -Z before they are rotated
+    v = [0.0, 0.0, -1.0]
+    length = math.sqrt(rotation[0] ** 2 + rotation[1] ** 2 + rotation[2] ** 2)
+    if length == 0:
+        return [0.0, -1.0]
+    k = [rotation[0] / length, rotation[1] / length, rotation[2] / length]
+    cos = math.cos(rotation[3])
+    sin = math.sin(rotation[3])
+    #Rodrigues' rotation of v around k
+    cross = [k[1] * v[2] - k[2] * v[1], k[2] * v[0] - k[0] * v[2], k[0] * v[1] - k[1] * v[0]]
+    dot = k[0] * v[0] + k[1] * v[1] + k[2] * v[2]
+    rotated = [v[i] * cos + cross[i] * sin + k[i] * dot * (1 - cos) for i in range(3)]
+    #Project onto the floor
+    length = math.sqrt(rotated[0] ** 2 + rotated[2] ** 2)
+    if length == 0:
+        return [0.0, -1.0]
+    return [rotated[0] / length, rotated[2] / length]
+
+
+class VictimGrid():
+    '''Uniform grid bucketing victims by the tile they are in'''
+
+    def __init__(self, humans: list, tileSize: float, origin: list, radius: float) -> None:
+        '''Build the grid from human objects (with a position, arrayPosition and checkPosition)'''
+        #Tile coordinates -> list of humans
+        self.cells = {}
+        self.tileSize = tileSize
+        self.origin = origin
+        #Distance a position must be within to be near a victim
+        self.radius = radius
+
+        for human in humans:
+            self.cells.setdefault(self.cellOf(human.position), []).append(human)
+
+    def cellOf(self, pos: list) -> tuple:
+        '''Get the tile coordinates containing a position [x, y, z]'''
+        return (math.floor((pos[0] - self.origin[0]) / self.tileSize), math.floor((pos[2] - self.origin[1]) / self.tileSize))
+
+    def nearby(self, pos: list) -> list:
+        '''Get the victims within range of a position [x, y, z], in the order they were added'''
+        minCell = self.cellOf([pos[0] - self.radius, 0, pos[2] - self.radius])
+        maxCell = self.cellOf([pos[0] + self.radius, 0, pos[2] + self.radius])
+        found = []
+        #Only the tiles the range circle overlaps need checking
+        for x in range(minCell[0], maxCell[0] + 1):
+            for z in range(minCell[1], maxCell[1] + 1):
+                for human in self.cells.get((x, z), []):
+                    if human.checkPosition(pos):
+                        found.append(human)
+        found.sort(key=lambda human: human.arrayPosition)
+        return found
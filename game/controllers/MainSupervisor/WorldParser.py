@@ -0,0 +1,356 @@
+"""World Parser v1
+
+Reads the parts of a world file the supervisor and offline tools need into a
+compact grid model, in a single pass over the file and without building the
+whole scene graph.
+
+Features:
+ - Tile walls and special tiles as one bit field per grid cell
+ - Checkpoint, trap, start and swamp boundaries (the *min and *max transforms)
+ - Victims in HUMANGROUP with their position, rotation, type and worth
+ - Model can be converted to and from a dictionary (for caching as JSON)
+ - Sidecar file next to a world holding its model, checked against the world by size and modification time (then by hash)
+ - Command line summary of world files
+"""
+
+import array
+import hashlib
+import json
+import os
+import re
+import sys
+import time
+
+# Bits of a grid cell
+FLOOR = 1
+TOP_WALL = 2
+RIGHT_WALL = 4
+BOTTOM_WALL = 8
+LEFT_WALL = 16
+START = 32
+TRAP = 64
+CHECKPOINT = 128
+SWAMP = 256
+
+# worldTile fields and the bit they set
+TILE_FLAGS = {
+    "floor": FLOOR,
+    "topWall": TOP_WALL,
+    "rightWall": RIGHT_WALL,
+    "bottomWall": BOTTOM_WALL,
+    "leftWall": LEFT_WALL,
+    "start": START,
+    "trap": TRAP,
+    "checkpoint": CHECKPOINT,
+    "swamp": SWAMP,
+}
+
+# Kinds of boundary, in the order the supervisor reads them
+BOUND_KINDS = ["checkpoint", "trap", "start", "swamp"]
+
+# Default type and worth of each victim proto (used when the world does not set them)
+VICTIM_DEFAULTS = {
+    "Victim": ["harmed", 10],
+    "HeatVictim": ["Heat", 10],
+}
+
+# DEF names of the boundary transforms, e.g. checkpoint0min
+BOUND_NAME = re.compile(r"^(" + "|".join(BOUND_KINDS) + r")(\d+)(min|max)$")
+
+# Tokens of a line: strings, brackets and braces or plain words
+TOKEN_PATTERN = re.compile(r'"(?:[^"\\]|\\.)*"|[{}\[\]]|[^\s{}\[\]"#,]+')
+
+# Version of the sidecar file format
+SIDECAR_VERSION = 1
+
+
+class WorldModel():
+    '''Grid model of a world file'''
+
+    def __init__(self, width: int, height: int, tileScale: list) -> None:
+        '''Create an empty model for a grid of width x height tiles'''
+        self.width = width
+        self.height = height
+        self.tileScale = tileScale
+        # Bits for each cell, indexed by z * width + x
+        self.cells = array.array('H', bytes(2 * width * height))
+        # Boundaries as the min then max translation [x, y, z] per id, for each kind
+        self.bounds = {}
+        for kind in BOUND_KINDS:
+            self.bounds[kind] = array.array('d')
+        # Victims in HUMANGROUP order
+        self.victimPositions = array.array('d')
+        self.victimRotations = array.array('d')
+        self.victimScores = array.array('i')
+        self.victimTypes = []
+        self.victimNames = []
+
+    def getCell(self, x: int, z: int) -> int:
+        '''Get the bits of a tile'''
+        return self.cells[z * self.width + x]
+
+    def numberOfBounds(self, kind: str) -> int:
+        '''Get the number of boundaries of a kind'''
+        return len(self.bounds[kind]) // 6
+
+    def getBound(self, kind: str, index: int) -> list:
+        '''Get the min and max translations [x, y, z] of a boundary'''
+        b = self.bounds[kind]
+        return [list(b[index * 6:index * 6 + 3]), list(b[index * 6 + 3:index * 6 + 6])]
+
+    def numberOfVictims(self) -> int:
+        return len(self.victimScores)
+
+    def getVictimPosition(self, index: int) -> list:
+        return list(self.victimPositions[index * 3:index * 3 + 3])
+
+    def getVictimRotation(self, index: int) -> list:
+        return list(self.victimRotations[index * 4:index * 4 + 4])
+
+    def toDict(self) -> dict:
+        '''Convert the model to a dictionary of lists'''
+        return {
+            "width": self.width,
+            "height": self.height,
+            "tileScale": self.tileScale,
+            "cells": self.cells.tolist(),
+            "bounds": {kind: self.bounds[kind].tolist() for kind in BOUND_KINDS},
+            "victimPositions": self.victimPositions.tolist(),
+            "victimRotations": self.victimRotations.tolist(),
+            "victimScores": self.victimScores.tolist(),
+            "victimTypes": self.victimTypes,
+            "victimNames": self.victimNames,
+        }
+
+    @staticmethod
+    def fromDict(data: dict):
+        '''Create a model from a dictionary made by toDict'''
+        model = WorldModel(data["width"], data["height"], data["tileScale"])
+        model.cells = array.array('H', data["cells"])
+        for kind in BOUND_KINDS:
+            model.bounds[kind] = array.array('d', data["bounds"][kind])
+        model.victimPositions = array.array('d', data["victimPositions"])
+        model.victimRotations = array.array('d', data["victimRotations"])
+        model.victimScores = array.array('i', data["victimScores"])
+        model.victimTypes = list(data["victimTypes"])
+        model.victimNames = list(data["victimNames"])
+        return model
+
+
+def convertValue(token: str):
+    '''Convert a field value token to a bool, number or string'''
+    if token == "TRUE":
+        return True
+    if token == "FALSE":
+        return False
+    if token.startswith('"'):
+        return token[1:-1]
+    try:
+        return float(token)
+    except ValueError:
+        return token
+
+
+class _Frame():
+    '''A node open while the file is read'''
+
+    def __init__(self, typeName: str, defName, parent) -> None:
+        self.typeName = typeName
+        self.defName = defName
+        # True if this node or one containing it is HUMANGROUP
+        self.inHumanGroup = defName == "HUMANGROUP" or (parent is not None and parent.inHumanGroup)
+        # Field values, only collected for the nodes that are kept
+        self.fields = None
+
+
+def parseLines(lines) -> WorldModel:
+    '''Read a world from an iterable of lines'''
+    tiles = []
+    bounds = {}
+    victims = []
+
+    stack = []
+    defName = None
+
+    for line in lines:
+        # Drop comments (including the #VRML header)
+        tokens = TOKEN_PATTERN.findall(line.split("#", 1)[0])
+        i = 0
+        while i < len(tokens):
+            token = tokens[i]
+            if token == "}":
+                # Close a node and keep it if it is wanted
+                frame = stack.pop()
+                if frame.fields is not None:
+                    if frame.typeName == "worldTile":
+                        tiles.append(frame.fields)
+                    elif frame.typeName in VICTIM_DEFAULTS:
+                        victims.append((frame.typeName, frame.fields))
+                    else:
+                        bounds[frame.defName] = frame.fields.get("translation", [0, 0, 0])
+                i += 1
+            elif token in ("[", "]"):
+                i += 1
+            elif token == "DEF":
+                defName = tokens[i + 1]
+                i += 2
+            elif token == "USE":
+                i += 2
+            elif i + 1 < len(tokens) and tokens[i + 1] == "{":
+                # Open a node
+                parent = stack[-1] if len(stack) > 0 else None
+                frame = _Frame(token, defName, parent)
+                if token == "worldTile":
+                    frame.fields = {}
+                elif token in VICTIM_DEFAULTS and frame.inHumanGroup:
+                    frame.fields = {}
+                elif token == "Transform" and defName is not None and BOUND_NAME.match(defName):
+                    frame.fields = {}
+                stack.append(frame)
+                defName = None
+                i += 2
+            else:
+                # A field, its value is the rest of the line up to the next node or bracket
+                name = token
+                i += 1
+                values = []
+                while i < len(tokens) and tokens[i] not in ("{", "}", "[", "]", "DEF", "USE") and not (i + 1 < len(tokens) and tokens[i + 1] == "{"):
+                    values.append(convertValue(tokens[i]))
+                    i += 1
+                if len(stack) > 0 and stack[-1].fields is not None and len(values) > 0:
+                    stack[-1].fields[name] = values[0] if len(values) == 1 else values
+
+    return buildModel(tiles, bounds, victims)
+
+
+def buildModel(tiles: list, bounds: dict, victims: list) -> WorldModel:
+    '''Create the grid model from the fields of the kept nodes'''
+    width = 0
+    height = 0
+    tileScale = [1.0, 1.0, 1.0]
+    if len(tiles) > 0:
+        # Every tile holds the size of the whole grid
+        width = int(tiles[0].get("width", 0))
+        height = int(tiles[0].get("height", 0))
+        tileScale = [tiles[0].get("xScale", 1.0), tiles[0].get("yScale", 1.0), tiles[0].get("zScale", 1.0)]
+        for tile in tiles:
+            width = max(width, int(tile.get("xPos", 0)) + 1)
+            height = max(height, int(tile.get("zPos", 0)) + 1)
+
+    model = WorldModel(width, height, tileScale)
+
+    for tile in tiles:
+        bits = 0
+        for name, flag in TILE_FLAGS.items():
+            if tile.get(name, False) is True:
+                bits |= flag
+        model.cells[int(tile.get("zPos", 0)) * width + int(tile.get("xPos", 0))] = bits
+
+    for kind in BOUND_KINDS:
+        # Ids count up from 0, stop at the first one missing (as the supervisor's count would)
+        index = 0
+        while kind + str(index) + "min" in bounds and kind + str(index) + "max" in bounds:
+            minPos = bounds[kind + str(index) + "min"]
+            maxPos = bounds[kind + str(index) + "max"]
+            model.bounds[kind].extend(minPos + maxPos)
+            index += 1
+
+    for typeName, fields in victims:
+        defaults = VICTIM_DEFAULTS[typeName]
+        model.victimPositions.extend(fields.get("translation", [0, 0, 0]))
+        model.victimRotations.extend(fields.get("rotation", [0, 0, 0, 0]))
+        model.victimTypes.append(fields.get("type", defaults[0]))
+        model.victimScores.append(int(fields.get("scoreWorth", defaults[1])))
+        model.victimNames.append(fields.get("name", typeName))
+
+    return model
+
+
+def parseWorld(path: str) -> WorldModel:
+    '''Read a world file into a grid model'''
+    with open(path, "r") as worldFile:
+        return parseLines(worldFile)
+
+
+def hashFile(path: str) -> str:
+    '''Get the SHA-1 hash of a file'''
+    digest = hashlib.sha1()
+    with open(path, "rb") as hashedFile:
+        for chunk in iter(lambda: hashedFile.read(65536), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def getSidecarPath(worldPath: str) -> str:
+    '''Get the path of the sidecar file for a world file'''
+    return os.path.splitext(worldPath)[0] + ".json"
+
+
+def writeSidecar(worldPath: str) -> WorldModel:
+    '''Write the sidecar file holding the model of a world file, returns the model'''
+    model = parseWorld(worldPath)
+    stat = os.stat(worldPath)
+    data = {
+        "version": SIDECAR_VERSION,
+        "worldSize": stat.st_size,
+        "worldTime": stat.st_mtime_ns,
+        "worldHash": hashFile(worldPath),
+        "model": model.toDict(),
+    }
+    with open(getSidecarPath(worldPath), "w") as sidecarFile:
+        json.dump(data, sidecarFile, separators=(",", ":"))
+    return model
+
+
+def loadSidecar(worldPath: str):
+    '''Get the model of a world file from its sidecar, None if it is missing or out of date'''
+    try:
+        with open(getSidecarPath(worldPath), "r") as sidecarFile:
+            data = json.load(sidecarFile)
+        if data.get("version") != SIDECAR_VERSION:
+            return None
+        # The world must not have changed since the sidecar was written
+        stat = os.stat(worldPath)
+        if data.get("worldSize") != stat.st_size:
+            return None
+        # Only hashed if it was modified since (or copied, checked out...)
+        if data.get("worldTime") != stat.st_mtime_ns and data.get("worldHash") != hashFile(worldPath):
+            return None
+        return WorldModel.fromDict(data["model"])
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+
+
+def printSummary(path: str) -> None:
+    '''Print the size and contents of a world file'''
+    start = time.perf_counter()
+    model = parseWorld(path)
+    parseTime = time.perf_counter() - start
+
+    print(path)
+    print("  grid: {} x {}  (parsed in {:.2f}ms)".format(model.width, model.height, parseTime * 1000))
+    for kind in BOUND_KINDS:
+        # Tiles flagged in the grid should each have a boundary
+        flagged = sum(1 for cell in model.cells if cell & TILE_FLAGS[kind])
+        warning = "" if flagged == model.numberOfBounds(kind) else "  (tiles flagged: {})".format(flagged)
+        print("  {}: {}{}".format(kind, model.numberOfBounds(kind), warning))
+    print("  victims: {}  (total worth {})".format(model.numberOfVictims(), sum(model.victimScores)))
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("Usage: python WorldParser.py [--json | --sidecar] world.wbt [world.wbt ...]")
+        sys.exit(1)
+
+    if sys.argv[1] == "--json":
+        # Print the model of each world as JSON
+        for worldPath in sys.argv[2:]:
+            print(json.dumps(parseWorld(worldPath).toDict()))
+    elif sys.argv[1] == "--sidecar":
+        # Write the sidecar file next to each world
+        for worldPath in sys.argv[2:]:
+            writeSidecar(worldPath)
+            print("Wrote " + getSidecarPath(worldPath))
+    else:
+        for worldPath in sys.argv[1:]:
+            printSummary(worldPath)
@@ -16,6 +16,11 @@ var robot1Name = "Robot 1"
 
 var scores = [0,0]
 
+//Number of history events shown
+var historyLength = 9;
+//History events currently shown for robot 0
+var history0 = [];
+
 function receive (message){
 	//Receive message from the python supervisor
 	//Split on comma
@@ -73,8 +78,14 @@ function receive (message){
 				activityUnloadedColour(1)
 				break;
 			case "historyUpdate":
+				//Replace the whole history
 				let msg = message.split(":");
-				let history0 = msg[0].split(",").slice(1,msg[0].length-1)
+				history0 = msg[0].split(",").slice(1,msg[0].length-1).filter(function(event){ return event != ""; });
+				updateHistory(history0)
+				break;
+			case "historyAppend":
+				//Add the new events to the end of the history, keeping the latest ones
+				history0 = history0.concat(parts.slice(1)).slice(-historyLength);
 				updateHistory(history0)
 				break;
 			case "robotInSimulation0":
@@ -181,13 +192,28 @@ function startup (){
 }
 
 function update (data){
-	//Update the ui each frame of the simulation
-	//Sets the scores and the timer
-	document.getElementById("score0").innerHTML = String(data[0]);
+	//Update the ui with the values that changed
+	//Sets the scores and the timer (empty values are unchanged)
+	if (data[0] != ""){
+		document.getElementById("score0").innerHTML = String(data[0]);
 
-	scores = [data[0],0]
+		scores[0] = data[0];
+	}
 
-	document.getElementById("timer").innerHTML = calculateTimeRemaining(data[1]);
+	if (data[1] != ""){
+		document.getElementById("timer").innerHTML = calculateTimeRemaining(data[1]);
+	}
+
+	//Scores of any other robots follow the timer
+	for (var i = 2; i < data.length; i++){
+		if (data[i] != ""){
+			scores[i - 1] = data[i];
+			var scoreElement = document.getElementById("score" + String(i - 1));
+			if (scoreElement != null){
+				scoreElement.innerHTML = String(data[i]);
+			}
+		}
+	}
 }
 
 function calculateTimeRemaining(done){
@@ -0,0 +1,67 @@
+"""Scoring Engine tests
+
+Runs the Webots-free scoring engine on hand built matches.
+
+Usage:
+    python -m unittest discover tests
+"""
+
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "game", "controllers", "MainSupervisor"))
+
+import SpatialGrid
+import ScoringEngine
+
+# Velocities of a moving and a stopped robot
+MOVING = [0.1, 0, 0, 0, 0, 0]
+STOPPED = [0, 0, 0, 0, 0, 0]
+
+# Robot position off the start tile, in front of the victim
+FRONT_OF_VICTIM = [0.5, 0, 0.45]
+
+
+def createEngine():
+    '''Create an engine for a match with a start tile and a harmed victim facing -Z'''
+    startTile = ScoringEngine.Tile([0, 0], [0.3, 0.3], [0.15, 0, 0.15])
+    victim = ScoringEngine.Victim([0.5, 0, 0.5], [0, 1, 0, 0], 0, "harmed", 10)
+
+    tileGrid = SpatialGrid.TileGrid([startTile])
+    victimGrid = SpatialGrid.VictimGrid([victim], tileGrid.tileSize, tileGrid.origin, ScoringEngine.Victim.radius)
+    return ScoringEngine.ScoringEngine(tileGrid, victimGrid, [startTile], 0, 1)
+
+
+def kinds(events: list) -> list:
+    '''Get the kinds of a list of events'''
+    return [event.kind for event in events]
+
+
+class TestVictimReports(unittest.TestCase):
+
+    def test_report_scored_once_stopped(self):
+        '''A report sent while moving is scored once the robot has stopped'''
+        engine = createEngine()
+        engine.step(0, [FRONT_OF_VICTIM], [MOVING], [[[(0.5, 0, 0.5), 'H']]])
+        engine.step(1, [FRONT_OF_VICTIM], [STOPPED])
+        events = engine.step(5, [FRONT_OF_VICTIM], [STOPPED])
+
+        self.assertIn(ScoringEngine.IDENTIFIED_VICTIM, kinds(events))
+        self.assertEqual(engine.getScore(0), 20)
+
+    def test_exit_message_drops_waiting_report(self):
+        '''An exit message sent off the start tile replaces a report waiting for the robot to stop'''
+        engine = createEngine()
+        engine.step(0, [FRONT_OF_VICTIM], [MOVING], [[[(0.5, 0, 0.5), 'H']]])
+        engine.step(0.5, [FRONT_OF_VICTIM], [MOVING], [[[(0, 0, 0), 'E']]])
+        engine.step(1, [FRONT_OF_VICTIM], [STOPPED])
+        events = engine.step(5, [FRONT_OF_VICTIM], [STOPPED])
+
+        self.assertNotIn(ScoringEngine.IDENTIFIED_VICTIM, kinds(events))
+        self.assertTrue(engine.inSimulation[0])
+        self.assertEqual(engine.getScore(0), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
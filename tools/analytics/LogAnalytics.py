@@ -0,0 +1,329 @@
+"""Match Log Analytics v1
+   Written for the RescueMaze supervisors
+
+Summarises a directory of match logs (the text logs written by MainSupervisor).
+The logs are parsed in parallel into one row per robot per match, held as a
+column per value, and summarised as tables of the scores, time to the first
+victim, relocations, misidentifications and checkpoints per minute.
+
+Parsed rows are cached next to the logs (keyed by each log's size and
+modification time) so a re-run only parses the logs that are new or changed.
+
+Usage:
+    python LogAnalytics.py [logs dir] [--workers N] [--no-cache] [--json] [--csv FILE]
+"""
+
+import argparse
+import array
+import concurrent.futures
+import glob
+import json
+import math
+import os
+import sys
+
+# Default logs dir, relative to this script
+LOGS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "game", "logs")
+
+# Name of the cache file in the logs dir, and the version of its contents
+CACHE_NAME = ".analytics-cache.json"
+CACHE_VERSION = 1
+
+# Logs parsed in this process when there are fewer than this many to parse
+MIN_PARALLEL = 16
+
+# Event text written to the log by the supervisor
+IDENTIFIED_TEXT = "Successful Victim Identification"
+MISIDENTIFIED_TEXT = "Misidentification of victim"
+RELOCATED_TEXT = "Relocating to checkpoint"
+CHECKPOINT_TEXT = "Found checkpoint"
+EXIT_TEXT = "Successful Exit"
+
+# Columns of a row, the name of each and the array type code it is held in
+COLUMNS = [
+    ("score", "l"),
+    ("checkpoints", "l"),
+    ("victims", "l"),
+    ("firstVictimTime", "d"),
+    ("relocations", "l"),
+    ("misidentifications", "l"),
+    ("checkpointsPerMinute", "d"),
+    ("playTime", "d"),
+    ("exited", "b"),
+]
+
+
+def parseTime(text: str) -> int:
+    '''Get the number of seconds in a "m:ss" or "h:mm:ss" time'''
+    seconds = 0
+    for part in text.split(":"):
+        seconds = seconds * 60 + int(part)
+    return seconds
+
+
+def parseLog(path: str) -> list:
+    '''Parse a text log into a row (name and the values of COLUMNS) for each robot, a log that can't be read has no rows'''
+    try:
+        with open(path, "r") as logFile:
+            lines = logFile.read().splitlines()
+    except (OSError, UnicodeDecodeError):
+        return []
+
+    maxDuration = 0
+    scores = {}
+    masks = {}
+    rows = []
+    robot = None
+    for line in lines:
+        if line.startswith("MAX_GAME_DURATION: "):
+            maxDuration = parseTime(line.split(": ", 1)[1])
+        elif line.startswith("ROBOT_") and ": " in line:
+            key, value = line.split(": ", 1)
+            parts = key.split("_")
+            if len(parts) == 3 and parts[2] == "SCORE":
+                scores[parts[1]] = int(value)
+            elif len(parts) == 3 and parts[2] == "CHECKPOINTS":
+                masks[parts[1]] = value
+            elif len(parts) == 2:
+                # The events of a robot follow its name
+                robot = {"id": parts[1], "name": value, "victims": 0, "firstVictimTime": math.nan, "relocations": 0,
+                         "misidentifications": 0, "foundCheckpoints": 0, "playTime": 0, "exited": 0}
+                rows.append(robot)
+        elif line == "":
+            robot = None
+        elif robot is not None:
+            # Events are "mm:ss event text" with the game time remaining
+            parts = line.split(" ", 1)
+            try:
+                elapsed = maxDuration - parseTime(parts[0])
+            except ValueError:
+                continue
+            text = parts[1] if len(parts) > 1 else ""
+            robot["playTime"] = elapsed
+            if text.startswith(IDENTIFIED_TEXT):
+                robot["victims"] += 1
+                if math.isnan(robot["firstVictimTime"]):
+                    robot["firstVictimTime"] = elapsed
+            elif text.startswith(MISIDENTIFIED_TEXT):
+                robot["misidentifications"] += 1
+            elif text.startswith(RELOCATED_TEXT):
+                robot["relocations"] += 1
+            elif text.startswith(CHECKPOINT_TEXT):
+                robot["foundCheckpoints"] += 1
+            elif text.startswith(EXIT_TEXT):
+                robot["exited"] = 1
+
+    result = []
+    for robot in rows:
+        # Logs written before the checkpoint masks count the checkpoint events instead
+        if robot["id"] in masks:
+            checkpoints = masks[robot["id"]].count("1")
+        else:
+            checkpoints = robot["foundCheckpoints"]
+        # Play time runs up to the robot's last event (at least a second so rates are defined)
+        minutes = max(robot["playTime"], 1) / 60
+        result.append([robot["name"], scores.get(robot["id"], 0), checkpoints, robot["victims"],
+                       robot["firstVictimTime"], robot["relocations"], robot["misidentifications"],
+                       robot["foundCheckpoints"] / minutes, robot["playTime"], robot["exited"]])
+    return result
+
+
+class LogColumns():
+    '''Rows of the parsed logs held as one array per column'''
+
+    def __init__(self) -> None:
+        self.files = []
+        self.names = []
+        self.columns = {}
+        for name, typeCode in COLUMNS:
+            self.columns[name] = array.array(typeCode)
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def add(self, fileName: str, row: list) -> None:
+        '''Add a row (robot name then the values of COLUMNS)'''
+        self.files.append(fileName)
+        self.names.append(row[0])
+        for (name, typeCode), value in zip(COLUMNS, row[1:]):
+            self.columns[name].append(value)
+
+
+def loadCache(path: str) -> dict:
+    '''Get the cached rows of each log (log name -> entry), empty if there is no usable cache'''
+    try:
+        with open(path, "r") as cacheFile:
+            data = json.load(cacheFile)
+        if data.get("version") == CACHE_VERSION:
+            return data["files"]
+    except (OSError, ValueError, KeyError, TypeError):
+        pass
+    return {}
+
+
+def saveCache(path: str, files: dict) -> None:
+    try:
+        with open(path, "w") as cacheFile:
+            # NaN is kept as JSON's NaN extension, which json reads back
+            json.dump({"version": CACHE_VERSION, "files": files}, cacheFile, separators=(",", ":"))
+    except OSError:
+        print("Couldn't write cache file " + path)
+
+
+def loadLogs(logsDir: str, workers=None, useCache=True) -> LogColumns:
+    '''Parse the logs in a dir (only the new or changed ones if there is a cache) into columns'''
+    paths = sorted(glob.glob(os.path.join(logsDir, "*.txt")))
+    cachePath = os.path.join(logsDir, CACHE_NAME)
+    cache = loadCache(cachePath) if useCache else {}
+
+    # Logs are reparsed if their size or modification time has changed
+    entries = {}
+    toParse = []
+    for path in paths:
+        fileName = os.path.basename(path)
+        stat = os.stat(path)
+        entry = cache.get(fileName)
+        if entry is not None and entry["size"] == stat.st_size and entry["mtime"] == stat.st_mtime:
+            entries[fileName] = entry
+        else:
+            entries[fileName] = {"size": stat.st_size, "mtime": stat.st_mtime, "rows": None}
+            toParse.append(path)
+
+    # Starting worker processes only pays off for more than a few logs
+    if len(toParse) < MIN_PARALLEL or workers == 1:
+        parsed = [parseLog(path) for path in toParse]
+    else:
+        # Several logs per task so the processes aren't waiting on each other
+        chunkSize = max(1, len(toParse) // (4 * (workers or os.cpu_count() or 1)))
+        with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as pool:
+            parsed = list(pool.map(parseLog, toParse, chunksize=chunkSize))
+    for path, rows in zip(toParse, parsed):
+        entries[os.path.basename(path)]["rows"] = rows
+
+    if useCache and (len(toParse) > 0 or len(entries) != len(cache)):
+        saveCache(cachePath, entries)
+
+    logColumns = LogColumns()
+    for fileName in sorted(entries):
+        for row in entries[fileName]["rows"]:
+            logColumns.add(fileName, row)
+    return logColumns
+
+
+def percentile(values: list, fraction: float) -> float:
+    '''Get the value at a fraction of the way through sorted values (nearest rank)'''
+    if len(values) == 0:
+        return math.nan
+    return values[min(len(values) - 1, max(0, math.ceil(fraction * len(values)) - 1))]
+
+
+def summarise(values) -> dict:
+    '''Get the count, mean, spread and range of the values that are not NaN'''
+    values = sorted(value for value in values if not math.isnan(value))
+    if len(values) == 0:
+        return {"count": 0, "mean": math.nan, "min": math.nan, "p10": math.nan, "median": math.nan, "p90": math.nan, "max": math.nan}
+    return {
+        "count": len(values),
+        "mean": sum(values) / len(values),
+        "min": values[0],
+        "p10": percentile(values, 0.1),
+        "median": percentile(values, 0.5),
+        "p90": percentile(values, 0.9),
+        "max": values[-1],
+    }
+
+
+def scoreDistribution(scores, bucketSize=10) -> dict:
+    '''Get the number of scores in each bucket (keyed by the bucket's lowest score)'''
+    buckets = {}
+    for score in scores:
+        bucket = (score // bucketSize) * bucketSize
+        buckets[bucket] = buckets.get(bucket, 0) + 1
+    return dict(sorted(buckets.items()))
+
+
+def analyse(logColumns: LogColumns) -> dict:
+    '''Get the summary of the parsed logs'''
+    columns = logColumns.columns
+    summary = {"logs": len(set(logColumns.files)), "robots": len(logColumns)}
+    for name, typeCode in COLUMNS:
+        if name != "exited":
+            summary[name] = summarise(columns[name])
+    summary["exitedShare"] = sum(columns["exited"]) / len(logColumns) if len(logColumns) > 0 else math.nan
+    summary["noVictimShare"] = sum(1 for value in columns["firstVictimTime"] if math.isnan(value)) / len(logColumns) if len(logColumns) > 0 else math.nan
+    summary["scoreDistribution"] = scoreDistribution(columns["score"])
+
+    # Mean score and number of matches of each robot name
+    teams = {}
+    for name, score in zip(logColumns.names, columns["score"]):
+        team = teams.setdefault(name, [0, 0])
+        team[0] += 1
+        team[1] += score
+    summary["teams"] = {name: {"matches": team[0], "meanScore": team[1] / team[0]} for name, team in sorted(teams.items())}
+    return summary
+
+
+def printSummary(summary: dict) -> None:
+    '''Print the summary as tables'''
+    print("{} logs, {} robot matches".format(summary["logs"], summary["robots"]))
+    print("")
+    print("{:<22}{:>8}{:>10}{:>10}{:>10}{:>10}{:>10}{:>10}".format("", "count", "mean", "min", "p10", "median", "p90", "max"))
+    for name, typeCode in COLUMNS:
+        if name not in summary:
+            continue
+        stats = summary[name]
+        print("{:<22}{:>8}{:>10.2f}{:>10.2f}{:>10.2f}{:>10.2f}{:>10.2f}{:>10.2f}".format(
+            name, stats["count"], stats["mean"], stats["min"], stats["p10"], stats["median"], stats["p90"], stats["max"]))
+    print("")
+    print("exited: {:.0%}   no victim found: {:.0%}".format(summary["exitedShare"], summary["noVictimShare"]))
+
+    print("")
+    print("score distribution")
+    distribution = summary["scoreDistribution"]
+    largest = max(distribution.values()) if len(distribution) > 0 else 0
+    for bucket, count in distribution.items():
+        print("  {:>5}-{:<5}{:>6}  {}".format(bucket, bucket + 9, count, "#" * round(40 * count / largest)))
+
+    print("")
+    print("{:<30}{:>8}{:>12}".format("team", "matches", "mean score"))
+    for name, team in summary["teams"].items():
+        print("{:<30}{:>8}{:>12.1f}".format(name, team["matches"], team["meanScore"]))
+
+
+def writeCsv(path: str, logColumns: LogColumns) -> None:
+    '''Write the rows of the parsed logs as a CSV file'''
+    names = [name for name, typeCode in COLUMNS]
+    with open(path, "w") as csvFile:
+        csvFile.write(",".join(["file", "robot"] + names) + "\n")
+        for i in range(len(logColumns)):
+            values = [logColumns.files[i], logColumns.names[i].replace(",", " ")]
+            values += [str(logColumns.columns[name][i]) for name in names]
+            csvFile.write(",".join(values) + "\n")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Summarise a directory of match logs")
+    parser.add_argument("logs", nargs="?", default=LOGS_DIR, help="directory of text logs")
+    parser.add_argument("--workers", type=int, help="number of processes parsing logs (default one per CPU)")
+    parser.add_argument("--no-cache", action="store_true", help="parse every log, without reading or writing the cache")
+    parser.add_argument("--json", action="store_true", help="print the summary as JSON")
+    parser.add_argument("--csv", help="file to write the row of each robot match to")
+    args = parser.parse_args()
+
+    if not os.path.isdir(args.logs):
+        print("No logs directory " + args.logs)
+        sys.exit(1)
+
+    logColumns = loadLogs(args.logs, args.workers, not args.no_cache)
+    summary = analyse(logColumns)
+
+    if args.csv:
+        writeCsv(args.csv, logColumns)
+    if args.json:
+        print(json.dumps(summary, indent=2))
+    else:
+        printSummary(summary)
+
+
+if __name__ == "__main__":
+    main()
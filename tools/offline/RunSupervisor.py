@@ -0,0 +1,87 @@
+"""Offline Supervisor Runner v1
+   Written for the RescueMaze supervisors
+
+Runs a supervisor controller against a world file using the offline stand-in for
+the Webots controller module, so the supervisor can be run and profiled without
+Webots. MainSupervisor is run in headless mode, so the match starts straight
+away and ends when the time is up.
+
+Usage:
+    python RunSupervisor.py [world file] [--supervisor NAME] [--moving] [--profile]
+"""
+
+import argparse
+import cProfile
+import os
+import pstats
+import runpy
+import sys
+import time
+
+#The stand-in controller package lives next to this script
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import controller
+
+
+def reportMoving(supervisor) -> None:
+    '''Step hook giving the robots a velocity so they are never relocated for lack of progress'''
+    number = 0
+    robot = supervisor.getFromDef("ROBOT0")
+    while robot is not None:
+        robot.setVelocity([0.1, 0, 0, 0, 0, 0])
+        number += 1
+        robot = supervisor.getFromDef("ROBOT" + str(number))
+
+
+def runSupervisor(name: str) -> None:
+    '''Run the supervisor controller script with the given name as the main module'''
+    controllerDir = os.path.join(controller.gameDir, "controllers", name)
+    #Webots runs controllers from their own directory
+    sys.path.insert(0, controllerDir)
+    os.chdir(controllerDir)
+    try:
+        runpy.run_path(os.path.join(controllerDir, name + ".py"), run_name="__main__")
+    except SystemExit:
+        pass
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Run a supervisor without Webots")
+    parser.add_argument("world", nargs="?", default=os.path.join(controller.gameDir, "worlds", "world1.wbt"), help="world file to load")
+    parser.add_argument("--supervisor", default="MainSupervisor", help="name of the supervisor controller")
+    parser.add_argument("--result", help="file to write the match result to")
+    parser.add_argument("--moving", action="store_true", help="report the robots as moving every step")
+    parser.add_argument("--profile", action="store_true", help="print the functions taking the most time")
+    args = parser.parse_args()
+
+    controller.loadWorld(args.world)
+
+    #Count the steps taken
+    steps = [0]
+    def countStep(supervisor):
+        steps[0] += 1
+    controller.addStepHook(countStep)
+    if args.moving:
+        controller.addStepHook(reportMoving)
+
+    #Start the match without the robot window
+    os.environ["RESCUEMAZE_HEADLESS"] = "1"
+    if args.result:
+        os.environ["RESCUEMAZE_RESULT"] = os.path.abspath(args.result)
+
+    profiler = cProfile.Profile() if args.profile else None
+    start = time.perf_counter()
+    if profiler is not None:
+        profiler.runcall(runSupervisor, args.supervisor)
+    else:
+        runSupervisor(args.supervisor)
+    wallTime = time.perf_counter() - start
+
+    print("{} steps in {:.3f}s ({:.0f} steps/s)".format(steps[0], wallTime, steps[0] / wallTime if wallTime > 0 else 0))
+
+    if profiler is not None:
+        pstats.Stats(profiler).sort_stats("cumulative").print_stats(25)
+
+
+if __name__ == "__main__":
+    main()
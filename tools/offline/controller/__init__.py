@@ -0,0 +1,583 @@
+"""Offline Webots Controller Stand-in v1
+   Written for the RescueMaze supervisors
+
+Implements the small part of the Webots `controller` API that MainSupervisor and
+ObjectPlacementSupervisor use, backed by a scene graph loaded from a .wbt file.
+There is no physics: nodes only move when something sets their fields, which
+is enough to run and profile the supervisor logic on machines without Webots.
+
+Put the directory containing this package at the front of sys.path and call
+loadWorld() before the supervisor creates its Supervisor instance.
+"""
+
+import os
+import re
+
+#Root of the game directory (protos, nodes and worlds)
+gameDir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "..", "game")
+gameDir = os.path.normpath(gameDir)
+
+#Interface defaults for the built in node types used by the worlds
+BASE_NODE_FIELDS = {
+    "Transform": {"translation": [0.0, 0.0, 0.0], "rotation": [0.0, 1.0, 0.0, 0.0], "children": []},
+    "Group": {"children": []},
+    "Solid": {"translation": [0.0, 0.0, 0.0], "rotation": [0.0, 1.0, 0.0, 0.0], "children": [], "name": "solid"},
+    "Robot": {"translation": [0.0, 0.0, 0.0], "rotation": [0.0, 1.0, 0.0, 0.0], "children": [], "name": "robot",
+              "controller": "", "customData": "", "supervisor": False, "window": ""},
+}
+
+#Token pattern for VRML97 style world files
+TOKEN_PATTERN = re.compile(r'"(?:[^"\\]|\\.)*"|[{}\[\]]|[^\s{}\[\]"#,]+|#[^\n]*')
+
+
+def tokenize(text: str) -> list:
+    '''Split world file text into tokens, dropping comments'''
+    return [t for t in TOKEN_PATTERN.findall(text) if not t.startswith("#")]
+
+
+def convertScalar(token: str):
+    '''Convert a single field value token into a Python value'''
+    if token == "TRUE":
+        return True
+    if token == "FALSE":
+        return False
+    if token.startswith('"'):
+        return token[1:-1].replace('\\"', '"')
+    try:
+        return int(token)
+    except ValueError:
+        pass
+    try:
+        return float(token)
+    except ValueError:
+        return token
+
+
+def isNumber(token: str) -> bool:
+    '''Returns true if the token is a numeric literal'''
+    return re.match(r'^[-+]?(\d+\.?\d*|\.\d+)([eE][-+]?\d+)?$', token) is not None
+
+
+class Parser():
+    '''Recursive descent parser producing Node objects from world file tokens'''
+
+    def __init__(self, tokens: list, protoFields: dict):
+        self.tokens = tokens
+        self.pos = 0
+        self.protoFields = protoFields
+        self.defs = {}
+
+    def peek(self, offset=0):
+        if self.pos + offset < len(self.tokens):
+            return self.tokens[self.pos + offset]
+        return None
+
+    def next(self):
+        token = self.tokens[self.pos]
+        self.pos = self.pos + 1
+        return token
+
+    def parseNodes(self) -> list:
+        '''Parse nodes until the tokens run out'''
+        nodes = []
+        while self.peek() is not None:
+            nodes.append(self.parseNode())
+        return nodes
+
+    def parseNode(self):
+        '''Parse a single (optionally DEF named) node or a USE reference'''
+        defName = None
+        token = self.next()
+        if token == "USE":
+            return self.defs.get(self.next())
+        if token == "DEF":
+            defName = self.next()
+            token = self.next()
+        node = Node(token, defName, self.protoFields.get(token, BASE_NODE_FIELDS.get(token, {})))
+        if defName is not None:
+            self.defs[defName] = node
+        #Opening brace of the node body
+        self.next()
+        while self.peek() != "}":
+            name = self.next()
+            node.setFieldValue(name, self.parseValue())
+        self.next()
+        return node
+
+    def parseValue(self):
+        '''Parse the value following a field name'''
+        token = self.peek()
+        if token == "[":
+            self.next()
+            values = []
+            while self.peek() != "]":
+                if self.isNodeStart():
+                    values.append(self.parseNode())
+                else:
+                    values.append(convertScalar(self.next()))
+            self.next()
+            return values
+        if self.isNodeStart():
+            return self.parseNode()
+        if isNumber(token):
+            values = []
+            while self.peek() is not None and isNumber(self.peek()):
+                values.append(convertScalar(self.next()))
+            return values[0] if len(values) == 1 else values
+        return convertScalar(self.next())
+
+    def isNodeStart(self) -> bool:
+        '''Returns true if the next tokens begin a node'''
+        token = self.peek()
+        if token in ("DEF", "USE"):
+            return True
+        if token is None or token in ("[", "]", "{", "}") or token.startswith('"') or isNumber(token):
+            return False
+        return self.peek(1) == "{"
+
+
+def loadProtoFields(protoDir: str) -> dict:
+    '''Read the interface defaults of every proto in the directory'''
+    protos = {}
+    fieldPattern = re.compile(r'^\s*(?:field|unconnectedField|hiddenField|vrmlField)\s+(\S+)\s+(\S+)\s+(.*)$')
+    for fileName in sorted(os.listdir(protoDir)):
+        if not fileName.endswith(".proto"):
+            continue
+        fields = {}
+        with open(os.path.join(protoDir, fileName), "r") as protoFile:
+            for line in protoFile:
+                if line.strip().startswith("]"):
+                    break
+                match = fieldPattern.match(line)
+                if match is None:
+                    continue
+                fieldType, name, rest = match.group(1), match.group(2), match.group(3)
+                rest = rest.split("#")[0].strip()
+                if fieldType.startswith("MF"):
+                    fields[name] = []
+                    continue
+                tokens = tokenize(rest)
+                values = [convertScalar(t) for t in tokens]
+                fields[name] = values[0] if len(values) == 1 else values
+        protos[fileName[:-len(".proto")]] = fields
+    return protos
+
+
+class Field():
+    '''A single field of a node'''
+
+    def __init__(self, node, name: str):
+        self.node = node
+        self.name = name
+
+    def _get(self):
+        return self.node.fields.get(self.name)
+
+    def _set(self, value) -> None:
+        self.node.fields[self.name] = value
+
+    def getSFVec3f(self) -> list:
+        return list(self._get())
+
+    def setSFVec3f(self, value: list) -> None:
+        self._set([float(v) for v in value])
+
+    def getSFRotation(self) -> list:
+        return list(self._get())
+
+    def setSFRotation(self, value: list) -> None:
+        self._set([float(v) for v in value])
+
+    def getSFBool(self) -> bool:
+        return bool(self._get())
+
+    def setSFBool(self, value: bool) -> None:
+        self._set(bool(value))
+
+    def getSFString(self) -> str:
+        return str(self._get())
+
+    def setSFString(self, value: str) -> None:
+        self._set(str(value))
+
+    def getSFInt32(self) -> int:
+        return int(self._get())
+
+    def setSFInt32(self, value: int) -> None:
+        self._set(int(value))
+
+    def getSFFloat(self) -> float:
+        return float(self._get())
+
+    def setSFFloat(self, value: float) -> None:
+        self._set(float(value))
+
+    def getMFNode(self, index: int):
+        return self._get()[index]
+
+    def getSFNode(self):
+        return self._get()
+
+    def getCount(self) -> int:
+        return len(self._get())
+
+    def importMFNode(self, position: int, filename: str) -> None:
+        '''Insert the node stored in a .wbo file into this field'''
+        with open(filename, "r") as nodeFile:
+            self.importMFNodeFromString(position, nodeFile.read())
+
+    def importMFNodeFromString(self, position: int, nodeString: str) -> None:
+        '''Insert a node described by a string into this field'''
+        world = self.node.world
+        parser = Parser(tokenize(nodeString), world.protoFields)
+        children = self._get()
+        for node in parser.parseNodes():
+            node.attach(world, self.node)
+            if position < 0 or position > len(children):
+                children.append(node)
+            else:
+                children.insert(position, node)
+                position = position + 1
+        world.indexDefs()
+
+    def removeMF(self, index: int) -> None:
+        del self._get()[index]
+
+
+class Node():
+    '''A scene graph node with its fields'''
+
+    def __init__(self, typeName: str, defName, defaults: dict):
+        self.typeName = typeName
+        self.defName = defName
+        self.fields = {}
+        for name, value in defaults.items():
+            self.fields[name] = list(value) if isinstance(value, list) else value
+        self.velocity = [0.0, 0.0, 0.0, 0.0, 0.0, 0.0]
+        self.world = None
+        self.parent = None
+        self.controllerRestarts = 0
+
+    def setFieldValue(self, name: str, value) -> None:
+        self.fields[name] = value
+
+    def attach(self, world, parent) -> None:
+        '''Bind this node and all its descendants to a world'''
+        self.world = world
+        self.parent = parent
+        for child in self.childNodes():
+            child.attach(world, self)
+
+    def childNodes(self) -> list:
+        nodes = []
+        for value in self.fields.values():
+            if isinstance(value, Node):
+                nodes.append(value)
+            elif isinstance(value, list):
+                nodes.extend(v for v in value if isinstance(v, Node))
+        return nodes
+
+    def getField(self, name: str):
+        if name not in self.fields:
+            return None
+        return Field(self, name)
+
+    def getDef(self) -> str:
+        return self.defName or ""
+
+    def getTypeName(self) -> str:
+        return self.typeName
+
+    def getVelocity(self) -> list:
+        return list(self.velocity)
+
+    def setVelocity(self, velocity: list) -> None:
+        self.velocity = [float(v) for v in velocity]
+
+    def getPosition(self) -> list:
+        return list(self.fields.get("translation", [0.0, 0.0, 0.0]))
+
+    def restartController(self) -> None:
+        self.controllerRestarts = self.controllerRestarts + 1
+
+    def remove(self) -> None:
+        '''Remove this node from its parent'''
+        if self.parent is None:
+            return
+        for value in self.parent.fields.values():
+            if isinstance(value, list) and self in value:
+                value.remove(self)
+        self.parent = None
+        self.world.indexDefs()
+
+
+class World():
+    '''Scene graph loaded from a world file'''
+
+    def __init__(self, path: str, protoDir=None):
+        self.path = os.path.abspath(path)
+        if protoDir is None:
+            protoDir = os.path.join(gameDir, "protos")
+        self.protoFields = loadProtoFields(protoDir)
+        with open(self.path, "r") as worldFile:
+            text = worldFile.read()
+        parser = Parser(tokenize(text), self.protoFields)
+        self.root = Node("Group", None, {"children": []})
+        self.root.world = self
+        self.root.fields["children"] = parser.parseNodes()
+        self.root.attach(self, None)
+        self.defs = {}
+        self.indexDefs()
+        #Poses restored by a simulation reset
+        self.initialPoses = []
+        stack = [self.root]
+        while len(stack) > 0:
+            node = stack.pop()
+            if "translation" in node.fields:
+                self.initialPoses.append((node, list(node.fields["translation"]), list(node.fields.get("rotation", [0.0, 1.0, 0.0, 0.0]))))
+            stack.extend(node.childNodes())
+
+    def resetPoses(self) -> None:
+        '''Move the nodes loaded from the world file back to where they started'''
+        for node, translation, rotation in self.initialPoses:
+            node.fields["translation"] = list(translation)
+            if "rotation" in node.fields:
+                node.fields["rotation"] = list(rotation)
+            node.velocity = [0.0, 0.0, 0.0, 0.0, 0.0, 0.0]
+
+    def indexDefs(self) -> None:
+        '''Rebuild the DEF name lookup (first definition in scene order wins)'''
+        self.defs = {}
+        stack = [self.root]
+        while len(stack) > 0:
+            node = stack.pop()
+            if node.defName is not None and node.defName not in self.defs:
+                self.defs[node.defName] = node
+            stack.extend(reversed(node.childNodes()))
+
+
+#The world used by the next Supervisor created
+_world = None
+#Scripted robot window messages and step callbacks for the next Supervisor
+_windowMessages = []
+_stepHooks = []
+
+
+def loadWorld(path: str) -> World:
+    '''Load the world file that Supervisor instances will be bound to'''
+    global _world
+    _world = World(path)
+    return _world
+
+
+def addWindowMessage(message: str) -> None:
+    '''Queue a message as if it was sent by the robot window'''
+    _windowMessages.append(message)
+
+
+def addStepHook(hook) -> None:
+    '''Register a function called with the supervisor after every step'''
+    _stepHooks.append(hook)
+
+
+class Device():
+    '''Base for the devices returned by the robot'''
+
+    def __init__(self, name: str):
+        self.name = name
+        self.samplingPeriod = 0
+
+    def enable(self, samplingPeriod: int) -> None:
+        self.samplingPeriod = samplingPeriod
+
+    def disable(self) -> None:
+        self.samplingPeriod = 0
+
+    def getSamplingPeriod(self) -> int:
+        return self.samplingPeriod
+
+
+class Receiver(Device):
+    '''Receiver holding a queue of packets'''
+
+    def __init__(self, name: str):
+        super().__init__(name)
+        self.packets = []
+        self.channel = 1
+
+    def getQueueLength(self) -> int:
+        return len(self.packets)
+
+    def getData(self) -> bytes:
+        return self.packets[0]
+
+    def getDataSize(self) -> int:
+        return len(self.packets[0])
+
+    def nextPacket(self) -> None:
+        del self.packets[0]
+
+    def setChannel(self, channel: int) -> None:
+        self.channel = channel
+
+    def getChannel(self) -> int:
+        return self.channel
+
+    def addPacket(self, data: bytes) -> None:
+        '''Queue a packet as if it was sent by a robot'''
+        self.packets.append(bytes(data))
+
+
+class Emitter(Device):
+    '''Emitter delivering packets to receivers on the same channel'''
+
+    def __init__(self, name: str, robot):
+        super().__init__(name)
+        self.robot = robot
+        self.channel = 1
+        self.sent = []
+
+    def send(self, data: bytes) -> int:
+        self.sent.append(bytes(data))
+        for receiver in _receivers:
+            if receiver.channel == self.channel or self.channel == -1:
+                receiver.addPacket(data)
+        return 1
+
+    def setChannel(self, channel: int) -> None:
+        self.channel = channel
+
+    def getChannel(self) -> int:
+        return self.channel
+
+
+#Every receiver created, so emitters can deliver to them
+_receivers = []
+
+
+class Supervisor():
+    '''Supervisor robot bound to the loaded world'''
+
+    SIMULATION_MODE_PAUSE = 0
+    SIMULATION_MODE_REAL_TIME = 1
+    SIMULATION_MODE_RUN = 2
+    SIMULATION_MODE_FAST = 3
+
+    def __init__(self):
+        if _world is None:
+            raise RuntimeError("No world loaded, call controller.loadWorld() first")
+        self.world = _world
+        #The robot node this supervisor controls (None if the world has no supervisor robot)
+        self.node = self.findSupervisorNode()
+        self.time = 0.0
+        self.mode = Supervisor.SIMULATION_MODE_REAL_TIME
+        self.devices = {}
+        self.windowMessages = _windowMessages
+        self.sentText = []
+        self.keepSentText = False
+        self.resets = 0
+        #A reset asked for takes effect at the end of the next step (as in Webots)
+        self.resetPending = False
+        self.quitStatus = None
+        self.stepHooks = _stepHooks
+
+    def findSupervisorNode(self):
+        '''Find the first robot node in the world with supervisor set'''
+        stack = [self.world.root]
+        while len(stack) > 0:
+            node = stack.pop()
+            if node.fields.get("supervisor") is True:
+                return node
+            stack.extend(reversed(node.childNodes()))
+        return None
+
+    def findDeviceNode(self, typeName: str, name: str):
+        '''Find a device node of this supervisor's robot by its name (None if it has no such device)'''
+        if self.node is None:
+            return None
+        stack = list(self.node.childNodes())
+        while len(stack) > 0:
+            node = stack.pop()
+            if node.typeName == typeName and node.fields.get("name", typeName.lower()) == name:
+                return node
+            stack.extend(node.childNodes())
+        return None
+
+    def getFromDef(self, name: str):
+        return self.world.defs.get(name)
+
+    def getRoot(self):
+        return self.world.root
+
+    def getTime(self) -> float:
+        return self.time
+
+    def getBasicTimeStep(self) -> float:
+        worldInfo = [n for n in self.world.root.fields["children"] if n.typeName == "WorldInfo"]
+        if len(worldInfo) > 0:
+            return float(worldInfo[0].fields.get("basicTimeStep", 32))
+        return 32.0
+
+    def getWorldPath(self) -> str:
+        return self.world.path
+
+    def getCustomData(self) -> str:
+        return ""
+
+    def step(self, duration: int) -> int:
+        '''Advance simulated time (no physics) and run the step hooks'''
+        if self.quitStatus is not None:
+            return -1
+        self.time = self.time + duration / 1000.0
+        for hook in self.stepHooks:
+            hook(self)
+        if self.resetPending:
+            self.resetPending = False
+            self.resets = self.resets + 1
+            self.time = 0.0
+            self.world.resetPoses()
+        return 0
+
+    def getReceiver(self, name: str) -> Receiver:
+        '''Get a receiver of the supervisor's robot (any name if the world has no supervisor robot), None if there isn't one'''
+        if name not in self.devices:
+            deviceNode = self.findDeviceNode("Receiver", name)
+            if self.node is not None and deviceNode is None:
+                print("Warning: no Receiver named \"" + name + "\" in the supervisor robot")
+                return None
+            receiver = Receiver(name)
+            if deviceNode is not None:
+                receiver.channel = int(deviceNode.fields.get("channel", 0))
+            self.devices[name] = receiver
+            _receivers.append(receiver)
+        return self.devices[name]
+
+    def getEmitter(self, name: str) -> Emitter:
+        if name not in self.devices:
+            self.devices[name] = Emitter(name, self)
+        return self.devices[name]
+
+    def wwiSendText(self, text: str) -> None:
+        if self.keepSentText:
+            self.sentText.append(text)
+
+    def wwiReceiveText(self) -> str:
+        if len(self.windowMessages) > 0:
+            return self.windowMessages.pop(0)
+        return ""
+
+    def simulationReset(self) -> None:
+        '''Restart the simulated time and restore the initial poses at the end of the next step (added or removed nodes stay as they are)'''
+        self.resetPending = True
+
+    def simulationResetPhysics(self) -> None:
+        pass
+
+    def simulationQuit(self, status: int) -> None:
+        self.quitStatus = status
+
+    def simulationSetMode(self, mode: int) -> None:
+        self.mode = mode
+
+    def simulationGetMode(self) -> int:
+        return self.mode
@@ -32,390 +32,161 @@ import math
 import WorldCreator
 import os
 import GUI
+import MapGrid
 dirname = os.path.dirname(__file__)
 
-#Object to contain information for a map tile
-class Tile ():
-    def __init__ (self) -> None:
-        '''Initialize the tile with all four walls and no special parts'''
-        #All walls
-        self.upperWall = True
-        self.lowerWall = True
-        self.leftWall = True
-        self.rightWall = True
-        #Linear walls
-        self.upperLinearWall = False
-        self.lowerLinearWall = False
-        self.leftLinearWall = False
-        self.rightLinearWall = False
-        #No special parts
-        self.checkpoint = False
-        self.trap = False
-        self.goal = False
-        self.swamp = False
-        #List of humans [up, right, down, left]
-        self.humans = [0,0,0,0]
-        self.hasHuman = False
-        #No obstacles yet
-        self.obstacle = False
-        #Linear flag
-        self.linear = False
-
-    def addWalls (self, wallList: list) -> None:
-        '''Add a list of walls'''
-        if 0 in wallList:
-            self.upperWall = True
-        if 1 in wallList:
-            self.rightWall = True
-        if 2 in wallList:
-            self.lowerWall = True
-        if 3 in wallList:
-            self.leftWall = True
-
-    def addLinearWall (self, wall: int) -> bool:
-        '''Set a list of linear walls'''
-        if 0 == wall and self.upperWall:
-            self.upperLinearWall = True
-            return True
-        if 1 == wall and self.rightWall:
-            self.rightLinearWall = True
-            return True
-        if 2 == wall and self.lowerWall:
-            self.lowerLinearWall = True
-            return True
-        if 3 == wall and self.leftWall:
-            self.leftLinearWall = True
-            return True
-        return False
-    def removeWalls (self, wallList: list) -> None:
-        '''Remove a list of walls'''
-        if 0 in wallList:
-            self.upperWall = False
-        if 1 in wallList:
-            self.rightWall = False
-        if 2 in wallList:
-            self.lowerWall = False
-        if 3 in wallList:
-            self.leftWall = False
-
-    def addCheckpoint (self) -> None:
-        '''Add a checkpoint - removes traps, goals and swamps'''
-        self.checkpoint = True
-        self.trap = False
-        self.goal = False
-        self.swamp = False
-
-    def removeCheckpoint (self) -> None:
-        '''Remove a checkpoint'''
-        self.checkpoint = False
-
-    def addTrap (self) -> None:
-        '''Add a trap - removes checkpoints, goals and swamps'''
-        self.trap = True
-        self.checkpoint = False
-        self.goal = False
-        self.swamp = False
-
-    def removeTrap (self) -> None:
-        '''Remove a trap'''
-        self.trap = False
-
-    def addGoal (self) -> None:
-        '''Add a goal - removes checkpoints, traps and swamps'''
-        self.goal = True
-        self.checkpoint = False
-        self.trap = False
-        self.swamp = False
-
-    def removeGoal (self) -> None:
-        '''Remove a goal'''
-        self.goal = False
-
-    def addSwamp (self) -> None:
-        '''Add a swamp - removes checkpoints, traps and goals'''
-        self.swamp = True
-        self.checkpoint = False
-        self.trap = False
-        self.goal = False
-
-    def removeSwamp (self) -> None:
-        '''Remove a swamp'''
-        self.swamp = False
-
-    def getWalls (self) -> list:
-        '''Returns a list of bools which represents if each of the four walls is present'''
-        return [self.upperWall, self.rightWall, self.lowerWall, self.leftWall]
-
-    def getLinearWalls (self) -> list:
-        '''Returns a list of bools which represents if each of the four linear walls is present'''
-        return [self.upperLinearWall, self.rightLinearWall, self.lowerLinearWall, self.leftLinearWall]
-
-    def getCheckpoint (self) -> bool:
-        '''Return if this tile has a checkpoint'''
-        return self.checkpoint
-
-    def getTrap (self) -> bool:
-        '''Return if this tile has a trap'''
-        return self.trap
-
-    def getGoal (self) -> bool:
-        '''Return if this tile has a goal'''
-        return self.goal
-
-    def getSwamp (self) -> bool:
-        '''Return if this tile has a swamp'''
-        return self.swamp
-
-    def addHuman (self, type, wall) -> bool:
-        '''Add a human to a given wall, returns true only if a wall was present in that direction and it didn't contain a human'''
-        #Get the walls from this tile
-        walls = self.getWalls()
-        #If the wall position is valid
-        if wall < len(walls) and wall < len(self.humans) and wall >= 0 and not self.hasHuman:
-            #If there isn't already a human on that wall
-            if walls[wall] and self.humans[wall] == 0:
-                #Set the human value
-                self.humans[wall] = type
-                #This tile does contain a human
-                self.hasHuman = True
-                #Successfully added
-                return True
-
-        #Failed to add human
-        return False
-
-    def getHuman (self) -> bool:
-        '''Returns true if there is a human on this tile'''
-        #Iterate humans list
-        for h in self.humans:
-            #If it is a human
-            if h != 0:
-                return True
-        #Otherwise
-        return False
-
-    def getHumanData (self) -> list:
-        '''Returns the human type and the wall it is on'''
-        #Iterate through the walls
-        for i in range(0, len(self.humans)):
-            #If there is a human
-            if self.humans[i] != 0:
-                #Return the human type and the wall
-                return self.humans[i], i
-
-        #Return no human
-        return 0, 0
-
-    def addObstacle(self) -> None:
-        '''Toggle flag for an obstacle to true'''
-        self.obstacle = True
-
-    def getObstacle(self) -> bool:
-        '''Returns true if an obstacle has been placed in this tile'''
-        return self.obstacle
-
-    def getTileType(self) -> bool:
-        return self.linear
-
-    def setLinear(self) -> None:
-        self.linear = True
-
-    def setFloating(self) -> None:
-        self.linear = False
-
-    def generatePixels (self) -> list:
-        '''Generate a grid of pixels for this tile'''
-        #Array to hold pixel information
-        pixels = []
-
-        #The background pixel colour
-        if self.linear:
-            basicPixel = 20
-        else:
-            basicPixel = 0
-
-        #Change background colour if this is a checkpoint / trap / goal / swamp
-        if self.checkpoint:
-            basicPixel = 2
-        if self.trap:
-            basicPixel = 3
-        if self.goal:
-            basicPixel = 4
-        if self.swamp:
-            basicPixel = 5
-
-
-        #Fill array with background pixels
-        for y in range(0, 100):
-            row = []
-            for x in range(0, 100):
-                if (y < 10 or y > 90 or x < 10 or x > 90) and self.linear:
-                    row.append(20)
-                else:
-                    row.append(basicPixel)
-            pixels.append(row)
-
-        #Add upper wall
-        if self.upperWall:
-            for x in range(0, 100):
-                pixels[0][x] = 1
-                pixels[1][x] = 1
-                pixels[2][x] = 1
-                pixels[3][x] = 1
-            #Add upper human
-            if self.humans[0] > 0:
-                hColour = 6
-                if self.humans[0] == 4:
-                    hColour = 7
-                for x in range(30, 70):
-                    pixels[4][x] = hColour
-                    pixels[5][x] = hColour
-                    pixels[6][x] = hColour
-        #Add left wall
-        if self.leftWall:
-            for y in range(0, 100):
-                pixels[y][0] = 1
-                pixels[y][1] = 1
-                pixels[y][2] = 1
-                pixels[y][3] = 1
-            #Add left human
-            if self.humans[3] > 0:
-                hColour = 6
-                if self.humans[3] == 4:
-                    hColour = 7
-                for y in range(30, 70):
-                    pixels[y][4] = hColour
-                    pixels[y][5] = hColour
-                    pixels[y][6] = hColour
-        #Add lower wall
-        if self.lowerWall:
-            for x in range(0, 100):
-                pixels[len(pixels) - 1][x] = 1
-                pixels[len(pixels) - 2][x] = 1
-                pixels[len(pixels) - 3][x] = 1
-                pixels[len(pixels) - 4][x] = 1
-            if self.humans[2] > 0:
-                hColour = 6
-                if self.humans[2] == 4:
-                    hColour = 7
-                for x in range(30, 70):
-                    pixels[len(pixels) - 5][x] = hColour
-                    pixels[len(pixels) - 6][x] = hColour
-                    pixels[len(pixels) - 7][x] = hColour
-        #Add right wall
-        if self.rightWall:
-            for y in range(0, 100):
-                pixels[y][len(pixels[0]) - 1] = 1
-                pixels[y][len(pixels[0]) - 2] = 1
-                pixels[y][len(pixels[0]) - 3] = 1
-                pixels[y][len(pixels[0]) - 4] = 1
-            #Add right human
-            if self.humans[1] > 0:
-                hColour = 6
-                if self.humans[1] == 4:
-                    hColour = 7
-                for y in range(30, 70):
-                    pixels[y][len(pixels[0]) - 5] = hColour
-                    pixels[y][len(pixels[0]) - 6] = hColour
-                    pixels[y][len(pixels[0]) - 7] = hColour
-
-        #Add obstacle marker
-        if self.obstacle:
-            for x in range(30, 70):
-                for y in range(30, 70):
-                    pixels[y][x] = 8
-
-        #Return array of pixels
-        return pixels
+#Colour of each pixel label in the map image
+LABEL_COLOURS = {
+    #Empty (white)
+    0: (255, 255, 255),
+    #Wall (blue)
+    1: (0, 0, 255),
+    #Checkpoint (grey)
+    2: (175, 175, 175),
+    #Trap (black)
+    3: (0, 0, 0),
+    #Goal (green)
+    4: (0, 255, 0),
+    #Swamp (tan)
+    5: (222, 184, 135),
+    #Visual human (magenta)
+    6: (255, 0, 255),
+    #Thermal human (red)
+    7: (255, 0, 0),
+    #Obstacle (orange)
+    8: (255, 127, 0),
+    #Linear tile (light blue)
+    20: (231, 243, 247),
+}
+
+#Flat palette [r, g, b, r, g, b...] indexed by label (unused labels are white)
+PALETTE = []
+for label in range(256):
+    PALETTE.extend(LABEL_COLOURS.get(label, (255, 255, 255)))
+
+#Pixel labels of each tile look (raster key -> 100 x 100 labels), shared by every map generated
+tileRasters = {}
+
+#Bits of a tile's word that don't change how it looks
+UNDRAWN_BITS = MapGrid.LINEAR_WALLS[0] | MapGrid.LINEAR_WALLS[1] | MapGrid.LINEAR_WALLS[2] | MapGrid.LINEAR_WALLS[3]
+
+def paintTile (canvas: bytearray, width: int, xStart: int, yStart: int, cell: int, humanType: int, humanWall: int) -> None:
+    '''Paint the pixel labels of a tile (its word and human) into a canvas (width pixels wide) with the tile's corner at xStart, yStart'''
+
+    def fill (x0: int, x1: int, y0: int, y1: int, label: int) -> None:
+        #Fill a rectangle of the tile (end not included) with a label, a row at a time
+        run = bytes([label]) * (x1 - x0)
+        for y in range(yStart + y0, yStart + y1):
+            rowStart = y * width + xStart
+            canvas[rowStart + x0:rowStart + x1] = run
+
+    linear = cell & MapGrid.LINEAR
+
+    #The background pixel colour
+    if linear:
+        basicPixel = 20
+    else:
+        basicPixel = 0
+
+    #Change background colour if this is a checkpoint / trap / goal / swamp
+    if cell & MapGrid.CHECKPOINT:
+        basicPixel = 2
+    if cell & MapGrid.TRAP:
+        basicPixel = 3
+    if cell & MapGrid.GOAL:
+        basicPixel = 4
+    if cell & MapGrid.SWAMP:
+        basicPixel = 5
+
+    #Fill with background pixels (linear tiles have a light border)
+    if linear:
+        fill(0, 100, 0, 100, 20)
+        fill(10, 91, 10, 91, basicPixel)
+    else:
+        fill(0, 100, 0, 100, basicPixel)
+
+    #Colour of the human (if there is one)
+    hColour = 6
+    if humanType == 4:
+        hColour = 7
+    if humanType <= 0:
+        humanWall = -1
+
+    #Add upper wall
+    if cell & MapGrid.WALLS[0]:
+        fill(0, 100, 0, 4, 1)
+        #Add upper human
+        if humanWall == 0:
+            fill(30, 70, 4, 7, hColour)
+    #Add left wall
+    if cell & MapGrid.WALLS[3]:
+        fill(0, 4, 0, 100, 1)
+        #Add left human
+        if humanWall == 3:
+            fill(4, 7, 30, 70, hColour)
+    #Add lower wall
+    if cell & MapGrid.WALLS[2]:
+        fill(0, 100, 96, 100, 1)
+        if humanWall == 2:
+            fill(30, 70, 93, 96, hColour)
+    #Add right wall
+    if cell & MapGrid.WALLS[1]:
+        fill(96, 100, 0, 100, 1)
+        #Add right human
+        if humanWall == 1:
+            fill(93, 96, 30, 70, hColour)
+
+    #Add obstacle marker
+    if cell & MapGrid.OBSTACLE:
+        fill(30, 70, 30, 70, 8)
+
+
+def getTileRaster (grid, x: int, y: int) -> bytes:
+    '''Get the pixel labels of a tile (100 rows of 100), painted once for each look and then reused'''
+    humanType, humanWall = grid.getHumanData(x, y)
+    cell = grid.get(x, y) & ~UNDRAWN_BITS
+    #The human's wall and whether it is thermal go above the word
+    key = cell
+    if humanType > 0:
+        key = key | ((humanWall * 2 + (humanType == 4) + 1) << 16)
+    raster = tileRasters.get(key)
+    if raster is None:
+        canvas = bytearray(100 * 100)
+        paintTile(canvas, 100, 0, 0, cell, humanType, humanWall)
+        raster = bytes(canvas)
+        tileRasters[key] = raster
+    return raster
 
 
 def createEmptyWorld(x, y):
-    '''Create a new array of x by y containing all walls on all tiles'''
-    array = []
-
-    #Iterate y axis
-    for i in range(0, y):
-
-        #Create this row
-        row = []
-
-        #Iterate x axis
-        for j in range(0, x):
-            #Add a new section of the maze
-            row.append(Tile())
-        #Add the row to the array
-        array.append(row)
-
-    #Return the generated array
-    return array
+    '''Create a new grid of x by y containing all walls on all tiles'''
+    return MapGrid.MapGrid(x, y)
 
 
 def printWorld(array):
     '''Output the array as a map image file'''
-    #Create a new image with the same dimensions as the array (in rgb mode with white background)
-    img = Image.new("RGB", (len(array[0]) * 100, len(array) * 100), "#FFFFFF")
-
-    xStart = 0
-    yStart = 0
+    width = array.width * 100
+    height = array.height * 100
+
+    #One pixel label per byte (0 is left white)
+    labels = bytearray(width * height)
+
+    #Iterate across y axis
+    for j in range(array.height):
+        #Iterate across x axis
+        for i in range(array.width):
+            #Copy the tile's pixels into place a row at a time
+            raster = memoryview(getTileRaster(array, i, j))
+            for y in range(0, 100):
+                rowStart = (j * 100 + y) * width + i * 100
+                labels[rowStart:rowStart + 100] = raster[y * 100:(y + 1) * 100]
 
-    #Iterate across x axis
-    for i in range(len(array[0])):
-        #Reset y start position each loop
-        yStart = 0
-        #Iterate across y axis
-        for j in range(len(array)):
-            #Get that tile
-            tile = array[j][i]
-            #If there is a tile there
-            if tile != None:
-                #Get the pixels for the tile
-                pixels = tile.generatePixels()
-                #Iterate across x of pixels
-                for x in range(0, 100):
-                    #Iterate across y of pixels
-                    for y in range(0, 100):
-                        #If there is a wall
-                        if pixels[y][x] == 1:
-                            #Add blue pixel
-                            img.putpixel((xStart + x, yStart + y), (0, 0, 255))
-                        #If there is a checkpoint
-                        if pixels[y][x] == 2:
-                            #Add grey pixel
-                            img.putpixel((xStart + x, yStart + y), (175, 175, 175))
-                        #If there is a trap
-                        if pixels[y][x] == 3:
-                            #Add black pixel
-                            img.putpixel((xStart + x, yStart + y), (0, 0, 0))
-                        #If there is a goal
-                        if pixels[y][x] == 4:
-                            #Add green pixel
-                            img.putpixel((xStart + x, yStart + y), (0, 255, 0))
-                        #If there is a swamp
-                        if pixels[y][x] == 5:
-                            #Add tan pixel
-                            img.putpixel((xStart + x, yStart + y), (222, 184, 135))
-                        #If there is a visual human
-                        if pixels[y][x] == 6:
-                            #Add magenta pixel
-                            img.putpixel((xStart + x, yStart + y), (255, 0, 255))
-                        #If there is a thermal human
-                        if pixels[y][x] == 7:
-                            #Add red pixel
-                            img.putpixel((xStart + x, yStart + y), (255, 0, 0))
-                        #If there is an obstacle
-                        if pixels[y][x] == 8:
-                            #Add orange pixel
-                            img.putpixel((xStart + x, yStart + y), (255, 127, 0))
-                        if pixels[y][x] == 20:
-                            #Add light blue pixel
-                            img.putpixel((xStart + x, yStart + y), (231, 243, 247))
-            #Increase y start each pass
-            yStart = yStart + 100
-        #Increase x start position each time
-        xStart = xStart + 100
+    #Create the image from the labels in one go, the palette maps each label to its colour
+    img = Image.frombytes("P", (width, height), bytes(labels))
+    img.putpalette(PALETTE)
 
     #Save the completed image to file
-    img.save(os.path.join(dirname, "map.png"), "PNG")
+    img.convert("RGB").save(os.path.join(dirname, "map.png"), "PNG")
 
 
 def openSurround(world, target, direction):
@@ -425,18 +196,12 @@ def openSurround(world, target, direction):
     #For each direction this is the alternative in the opposite direction
     alternateDirections = [2, 3, 0, 1]
 
-    #Get the target tile
-    thisTile = world[target[1]][target[0]]
-
     #Get the position of the tile being opened to
     opened = [target[0] + around[direction][0], target[1] + around[direction][1]]
 
-    #Get the other tile
-    thatTile = world[opened[1]][opened[0]]
-
     #Open the walls in both tiles
-    thatTile.removeWalls([alternateDirections[direction]])
-    thisTile.removeWalls([direction])
+    world.clear(opened[0], opened[1], MapGrid.WALLS[alternateDirections[direction]])
+    world.clear(target[0], target[1], MapGrid.WALLS[direction])
 
     #Return the position that was opened to
     return opened
@@ -456,7 +221,7 @@ def getAllAround (world, pos):
         #Get the position
         otherPos = [pos[0] + a[0], pos[1] + a[1]]
         #If the position is in the grid
-        if otherPos[0] >= 0 and otherPos[0] < len(world[0]) and otherPos[1] >= 0 and otherPos[1] < len(world):
+        if world.inBounds(otherPos[0], otherPos[1]):
             #Add position and direction to list
             aroundPositions.append(otherPos)
             aroundDirs.append(d)
@@ -469,110 +234,7 @@ def getAllAround (world, pos):
 
 def depthFirstMaze (world, start):
     '''Generate a maze using depth first search'''
-    #List of tiles that have been visited
-    visited = [start]
-    #The current stack - allowing for backtracking
-    stack = [start]
-
-    #Currently selected point on the stack
-    pointer = 0
-
-    #If the algorithm has finished
-    done = False
-
-    #While it is still generating
-    while not done:
-        usable = []
-        #Get all the tiles around the current one
-        posList, directions = getAllAround(world, stack[pointer])
-        #Iterate through found tiles
-        for i in range(len(posList)):
-            #If it hasn't been visited yet
-            if posList[i] not in visited:
-                #Add to the list of usable tiles with it's direction
-                usable.append([posList[i], directions[i]])
-
-        #If there are tiles that can be reached
-        if len(usable) > 0:
-            #Pick a random tile
-            r = random.randrange(0, len(usable))
-            #Open the wall to that tile
-            openSurround(world, stack[pointer], usable[r][1])
-            #Add tile to visited
-            visited.append(usable[r][0])
-            #Add tile to stack
-            stack.append(usable[r][0])
-            #Increment pointer to point at new tile
-            pointer = pointer + 1
-        else:
-            #If there are no unvisited tiles to go to
-            #Decrement pointer (go back a tile)
-            pointer = pointer - 1
-            #Remove last item from stack
-            del stack[len(stack) - 1]
-            #If the pointer has retreated past the start
-            if pointer < 0:
-                #The algorithm is finished
-                done = True
-
-
-def checkConnect (world, start, check, avoid):
-    '''Check if the start and check points can be connected without avoid'''
-    #List of used tiles
-    visited = [start, avoid]
-    #Stack to hold the tile path
-    stack = [start]
-
-    #Pointer - current tile
-    pointer = 0
-
-    #Finished
-    done = False
-
-    #Until it has finished
-    while not done:
-        usable = []
-        #Get surrounding tiles
-        posList, directions = getAllAround(world, stack[pointer])
-        #Get the walls of the current tile
-        tileWalls = world[stack[pointer][1]][stack[pointer][0]].getWalls()
-        #Iterate surrounding tiles
-        for i in range(len(posList)):
-            #If the tile hasn't already been visited and the wall is open to get to it
-            if posList[i] not in visited and not tileWalls[directions[i]]:
-                #Get the tile that corresponds to that movement
-                otherTile = world[posList[i][1]][posList[i][0]]
-                #If there is a tile there
-                if otherTile != None:
-                    #If that tile isn't a trap or swamp or obstacle
-                    if not otherTile.getTrap() and not otherTile.getSwamp() and not otherTile.getObstacle():
-                        #Add the tile to usable tiles
-                        usable.append([posList[i], directions[i]])
-
-        #Iterate through usable tiles
-        for u in usable:
-            #If it is the tile being searched for
-            if u[0] == check:
-                #The connection can be made
-                return True
-
-        #If there are tiles to go to
-        if len(usable) > 0:
-            #Move to the next one
-            visited.append(usable[0][0])
-            stack.append(usable[0][0])
-            pointer = pointer + 1
-        else:
-            #Move back a tile
-            pointer = pointer - 1
-            del stack[len(stack) - 1]
-            #If it has moved back past the start
-            if pointer < 0:
-                #It has finished
-                done = True
-
-    #Connection could not be made
-    return False
+    world.carveMaze(start)
 
 
 def addCheckPoints(array, checkpoints, startTile, endTile, x, y):
@@ -586,7 +248,7 @@ def addCheckPoints(array, checkpoints, startTile, endTile, x, y):
     #Iterate through surrounding tiles
     for i in range(0, len(aroundStart)):
         #If there is not a wall to block
-        if not array[startTile[1]][startTile[0]].getWalls()[aroundStartDir[i]]:
+        if not array.has(startTile[0], startTile[1], MapGrid.WALLS[aroundStartDir[i]]):
             #Cannot place check point here
             disallowedSpaces.append([aroundStart[i][0], aroundStart[i][1]])
 
@@ -612,12 +274,10 @@ def addCheckPoints(array, checkpoints, startTile, endTile, x, y):
             yPos = random.randint(q[0][1], q[1][1])
             #If it is allowed to put the checkpoint there
             if [xPos, yPos] not in disallowedSpaces:
-                #Get the tile
-                tile = array[yPos][xPos]
                 #If there isn't already a checkpoint or trap there
-                if not tile.getCheckpoint() and not tile.getTrap() and not tile.getGoal():
+                if not array.has(xPos, yPos, MapGrid.CHECKPOINT | MapGrid.TRAP | MapGrid.GOAL):
                     #Add a checkpoint
-                    tile.addCheckpoint()
+                    array.setSpecial(xPos, yPos, MapGrid.CHECKPOINT)
                     #Add this tile and four surrounding to not allowed spaces
                     disallowedSpaces.append([xPos, yPos])
                     around = [[0, -1], [1, 0], [0, 1], [-1, 0]]
@@ -628,7 +288,7 @@ def addCheckPoints(array, checkpoints, startTile, endTile, x, y):
 
 
 def addTraps(array, traps, startTile, endTile, x, y):
-    '''Add a number of traps to the map'''
+    '''Add a number of traps to the map (fewer if there is nowhere left a trap can go)'''
     #Split the grid into quadrants
     quads = [[[0, 0], [int(x / 2) - 1, int(y / 2) - 1]],
              [[int(x / 2), 0], [x - 1, int(y / 2) - 1]],
@@ -637,47 +297,36 @@ def addTraps(array, traps, startTile, endTile, x, y):
 
     #Iterate for each trap
     for i in range(0, traps):
-        #It hasn't added the trap yet
-        added = False
-        #Until the trap has been added
-        while not added:
-            #Pick a random quadrant
-            rQ = random.randrange(0, len(quads))
-            q = quads[rQ]
-            #Generate a random position
-            xPos = random.randint(q[0][0], q[1][0])
-            yPos = random.randint(q[0][1], q[1][1])
-            #Get the tile
-            tile = array[yPos][xPos]
-            #If it isn't the start or end and there is a tile there
-            if [xPos, yPos] != startTile and [xPos, yPos] != endTile and tile != None:
-                #If there isn't a checkpoint
-                if not tile.getCheckpoint():
-                    allowed = True
-                    #Surrounding tile positions
-                    around = [[0, -1], [1, 0], [0, 1], [-1, 0]]
-                    #Iterate for surrounding
-                    for a in around:
-                        #Get the tile
-                        checkTile = None
-                        if yPos + a[1] >= 0 and yPos + a[1] < len(array) and xPos + a[0] >= 0 and xPos + a[0] < len(array[0]):
-                            checkTile = array[yPos + a[1]][xPos + a[0]]
-                        #If there is a tile there
-                        if checkTile != None:
-                            #If there isn't a trap there
-                            if not checkTile.getTrap() and not checkTile.getGoal():
-                                #If a connection cannot be made to the start
-                                if not checkConnect(array, startTile ,[xPos + a[0], yPos + a[1]], [xPos, yPos]):
-                                    #The trap cannot be placed here
-                                    allowed = False
-
-                    #If the trap can be placed here
-                    if allowed:
-                        #Add the trap
-                        added = True
-                        tile.addTrap()
-                        #Remove the quadrant from the options
-                        del quads[rQ]
+        #Find the tiles that would cut part of the maze off from the rest if they were a trap
+        tileStates = array.articulationPoints(startTile, MapGrid.TRAP | MapGrid.SWAMP | MapGrid.OBSTACLE)
+
+        #Tiles in each quadrant a trap can be placed on
+        options = []
+        for q in quads:
+            quadOptions = []
+            for yPos in range(q[0][1], q[1][1] + 1):
+                for xPos in range(q[0][0], q[1][0] + 1):
+                    #If it isn't the start or end, can be reached and leaves the maze connected
+                    if [xPos, yPos] != startTile and [xPos, yPos] != endTile and tileStates[array.index(xPos, yPos)] == MapGrid.REACHABLE:
+                        #If there isn't a checkpoint
+                        if not array.has(xPos, yPos, MapGrid.CHECKPOINT):
+                            quadOptions.append([xPos, yPos])
+            options.append(quadOptions)
+
+        #Quadrants that have somewhere to place a trap
+        usableQuads = [q for q in range(0, len(quads)) if len(options[q]) > 0]
+
+        #If the trap cannot be placed anywhere
+        if len(usableQuads) == 0:
+            break
+
+        #Pick a random quadrant and position in it
+        rQ = usableQuads[random.randrange(0, len(usableQuads))]
+        xPos, yPos = options[rQ][random.randrange(0, len(options[rQ]))]
+        #Add the trap
+        array.setSpecial(xPos, yPos, MapGrid.TRAP)
+        #Remove the quadrant from the options
+        del quads[rQ]
 
 
 def addSwamps(array, swamps, startTile, endTile, x, y):
@@ -691,7 +340,7 @@ def addSwamps(array, swamps, startTile, endTile, x, y):
     #Iterate through surrounding tiles
     for i in range(0, len(aroundStart)):
         #If there is not a wall to block
-        if not array[startTile[1]][startTile[0]].getWalls()[aroundStartDir[i]]:
+        if not array.has(startTile[0], startTile[1], MapGrid.WALLS[aroundStartDir[i]]):
             #Cannot place check point here
             disallowedSpaces.append([aroundStart[i][0], aroundStart[i][1]])
 
@@ -705,20 +354,19 @@ def addSwamps(array, swamps, startTile, endTile, x, y):
             #Get a random tile
             xPos = random.randrange(0, x)
             yPos = random.randrange(0, y)
-            tile = array[yPos][xPos]
             #If this isn't the start, end or not a tile
             if [xPos, yPos] not in disallowedSpaces:
                 #If there is nothing there already
-                if not tile.getGoal() and not tile.getCheckpoint() and not tile.getSwamp() and not tile.getTrap():
+                if not array.has(xPos, yPos, MapGrid.SPECIAL):
                     #Add the swamp
-                    tile.addSwamp()
+                    array.setSpecial(xPos, yPos, MapGrid.SWAMP)
                     added = True
             #Increment counter
             attempt = attempt + 1
 
 
 def generateHumanSpaces(array, x, y):
-    '''Generate a list of wall groups with directions'''
+    '''Generate a list of wall groups (lists of tile positions) with directions'''
     wallGroups = []
 
     #Two directional lists of walls
@@ -728,19 +376,20 @@ def generateHumanSpaces(array, x, y):
     #Iterate through each tile (left to right, top to bottom)
     for yPos in range(0, y):
         for xPos in range(0, x):
-            #Get this tile
-            cTile = array[yPos][xPos]
+            #Get this tile's walls and if it has a special tile state
+            cWalls = array.getWalls(xPos, yPos)
+            cSpecial = array.has(xPos, yPos, MapGrid.SPECIAL)
             #If this has an upper wall and no special tile states
-            if cTile.getWalls()[0] and not cTile.getTrap() and not cTile.getCheckpoint() and not cTile.getSwamp() and not cTile.getGoal():
+            if cWalls[0] and not cSpecial:
                 #Add this tile to the list of tiles
-                currentGroup.append(cTile)
+                currentGroup.append([xPos, yPos])
             #Otherwise if there are tiles in the group
             elif len(currentGroup) != 0:
                 #Add group to list with upper direction
                 wallGroups.append([0, currentGroup])
                 currentGroup = []
             #If there is a wall on the right
-            if cTile.getWalls()[1] and len(currentGroup) != 0:
+            if cWalls[1] and len(currentGroup) != 0:
                 #End the group and add to the list with direction
                 wallGroups.append([0, currentGroup])
                 currentGroup = []
@@ -754,16 +403,16 @@ def generateHumanSpaces(array, x, y):
                 currentGroup = []
 
             #If this has a lower wall and no special tile states
-            if cTile.getWalls()[2] and not cTile.getTrap() and not cTile.getCheckpoint() and not cTile.getSwamp() and not cTile.getGoal():
+            if cWalls[2] and not cSpecial:
                 #Add this tile to the list of tiles
-                currentGroupOther.append(cTile)
+                currentGroupOther.append([xPos, yPos])
             #Otherwise if there are tiles in the group
             elif len(currentGroupOther) != 0:
                 #Add group to list with down direction
                 wallGroups.append([2, currentGroupOther])
                 currentGroupOther = []
             #If there is a wall on the right
-            if cTile.getWalls()[1] and len(currentGroupOther) != 0:
+            if cWalls[1] and len(currentGroupOther) != 0:
                 #End the group and add to the list with direction
                 wallGroups.append([2, currentGroupOther])
                 currentGroupOther = []
@@ -779,19 +428,20 @@ def generateHumanSpaces(array, x, y):
     #Iterate through each tile (top to bottom, left to right)
     for xPos in range(0, x):
         for yPos in range(0, y):
-            #Get this tile
-            cTile = array[yPos][xPos]
+            #Get this tile's walls and if it has a special tile state
+            cWalls = array.getWalls(xPos, yPos)
+            cSpecial = array.has(xPos, yPos, MapGrid.SPECIAL)
             #If this has a right wall and no special tile states
-            if cTile.getWalls()[1] and not cTile.getTrap() and not cTile.getCheckpoint() and not cTile.getSwamp() and not cTile.getGoal():
+            if cWalls[1] and not cSpecial:
                 #Add this tile to the list of tiles
-                currentGroup.append(cTile)
+                currentGroup.append([xPos, yPos])
             #Otherwise if there are tiles in the group
             elif len(currentGroup) != 0:
                 #Add group to list with right direction
                 wallGroups.append([1, currentGroup])
                 currentGroup = []
             #If there is a wall on the bottom
-            if cTile.getWalls()[2] and len(currentGroup) != 0:
+            if cWalls[2] and len(currentGroup) != 0:
                 #End the group and add to the list with direction
                 wallGroups.append([1, currentGroup])
                 currentGroup = []
@@ -804,18 +454,17 @@ def generateHumanSpaces(array, x, y):
                 #End group
                 currentGroup = []
 
-            cTile = array[yPos][xPos]
             #If this has a left wall and no special tile states
-            if cTile.getWalls()[3] and not cTile.getTrap() and not cTile.getCheckpoint() and not cTile.getSwamp() and not cTile.getGoal():
+            if cWalls[3] and not cSpecial:
                 #Add this tile to the list of tiles
-                currentGroupOther.append(cTile)
+                currentGroupOther.append([xPos, yPos])
             #Otherwise if there are tiles in the group
             elif len(currentGroupOther) != 0:
                 #Add group to list with left direction
                 wallGroups.append([3, currentGroupOther])
                 currentGroupOther = []
             #If there is a wall on the bottom
-            if cTile.getWalls()[2] and len(currentGroupOther) != 0:
+            if cWalls[2] and len(currentGroupOther) != 0:
                 #End the group and add to the list with direction
                 wallGroups.append([3, currentGroupOther])
                 currentGroupOther = []
@@ -885,9 +534,9 @@ def addHumans (array, numberVisual, numberThermal, x, y):
                     #Get the group data
                     group = wallGroupData[r][1]
                     #Randomly select a tile in that group
-                    tile = group[random.randrange(0, len(group))]
+                    tilePos = group[random.randrange(0, len(group))]
                     #Attempt to add a human
-                    success = tile.addHuman(h, wallGroupData[r][0])
+                    success = array.addHuman(tilePos[0], tilePos[1], h, wallGroupData[r][0])
                     #If added successfully
                     if success:
                         added = True
@@ -911,57 +560,54 @@ def addHumans (array, numberVisual, numberThermal, x, y):
     return humansPlaced
 
 def setLinearWalls(array, current, rot):
-    if len(array) > current[1] and current[1] >= 0:
-        if len(array[current[1]]) > current[0] and current[0] >= 0:
-            if array[current[1]][current[0]]:
-                tile = array[current[1]][current[0]]
-                tile.setLinear()
-                if (tile.getTileType() and tile.getLinearWalls()[rot]) or not tile.getWalls()[rot]:
-                    return
-                ro = rot
-                for i in range(4):
-                    if not tile.addLinearWall(ro):
-                        break
-                    ro = ro + 1
-                    if ro > 3:
-                        ro = 0
-                ro = rot
-                for i in range(4):
-                    if not tile.addLinearWall(ro):
-                        break
-                    ro = ro - 1
-                    if ro < 0:
-                        ro = 3
-
-                walls = tile.getLinearWalls()
-                if walls[0]:
-                    #Top
-                    setLinearWalls(array,[current[0]-1, current[1]], 0)
-                    setLinearWalls(array,[current[0]+1, current[1]], 0)
-                    setLinearWalls(array,[current[0]-1, current[1]-1], 2)
-                    setLinearWalls(array,[current[0], current[1]-1], 2)
-                    setLinearWalls(array,[current[0]+1, current[1]-1], 2)
-                if walls[1]:
-                    #Right
-                    setLinearWalls(array,[current[0], current[1]-1], 1)
-                    setLinearWalls(array,[current[0], current[1]+1], 1)
-                    setLinearWalls(array,[current[0]+1, current[1]-1], 3)
-                    setLinearWalls(array,[current[0]+1, current[1]], 3)
-                    setLinearWalls(array,[current[0]+1, current[1]+1], 3)
-                if walls[2]:
-                    #Bottom
-                    setLinearWalls(array,[current[0]-1, current[1]], 2)
-                    setLinearWalls(array,[current[0]+1, current[1]], 2)
-                    setLinearWalls(array,[current[0]-1, current[1]+1], 0)
-                    setLinearWalls(array,[current[0], current[1]+1], 0)
-                    setLinearWalls(array,[current[0]+1, current[1]+1], 0)
-                if walls[3]:
-                    #Left
-                    setLinearWalls(array,[current[0], current[1]-1], 3)
-                    setLinearWalls(array,[current[0], current[1]+1], 3)
-                    setLinearWalls(array,[current[0]-1, current[1]-1], 1)
-                    setLinearWalls(array,[current[0]-1, current[1]], 1)
-                    setLinearWalls(array,[current[0]-1, current[1]+1], 1)
+    if array.inBounds(current[0], current[1]):
+        array.set(current[0], current[1], MapGrid.LINEAR)
+        if array.has(current[0], current[1], MapGrid.LINEAR_WALLS[rot]) or not array.has(current[0], current[1], MapGrid.WALLS[rot]):
+            return
+        ro = rot
+        for i in range(4):
+            if not array.addLinearWall(current[0], current[1], ro):
+                break
+            ro = ro + 1
+            if ro > 3:
+                ro = 0
+        ro = rot
+        for i in range(4):
+            if not array.addLinearWall(current[0], current[1], ro):
+                break
+            ro = ro - 1
+            if ro < 0:
+                ro = 3
+
+        walls = array.getLinearWalls(current[0], current[1])
+        if walls[0]:
+            #Top
+            setLinearWalls(array,[current[0]-1, current[1]], 0)
+            setLinearWalls(array,[current[0]+1, current[1]], 0)
+            setLinearWalls(array,[current[0]-1, current[1]-1], 2)
+            setLinearWalls(array,[current[0], current[1]-1], 2)
+            setLinearWalls(array,[current[0]+1, current[1]-1], 2)
+        if walls[1]:
+            #Right
+            setLinearWalls(array,[current[0], current[1]-1], 1)
+            setLinearWalls(array,[current[0], current[1]+1], 1)
+            setLinearWalls(array,[current[0]+1, current[1]-1], 3)
+            setLinearWalls(array,[current[0]+1, current[1]], 3)
+            setLinearWalls(array,[current[0]+1, current[1]+1], 3)
+        if walls[2]:
+            #Bottom
+            setLinearWalls(array,[current[0]-1, current[1]], 2)
+            setLinearWalls(array,[current[0]+1, current[1]], 2)
+            setLinearWalls(array,[current[0]-1, current[1]+1], 0)
+            setLinearWalls(array,[current[0], current[1]+1], 0)
+            setLinearWalls(array,[current[0]+1, current[1]+1], 0)
+        if walls[3]:
+            #Left
+            setLinearWalls(array,[current[0], current[1]-1], 3)
+            setLinearWalls(array,[current[0], current[1]+1], 3)
+            setLinearWalls(array,[current[0]-1, current[1]-1], 1)
+            setLinearWalls(array,[current[0]-1, current[1]], 1)
+            setLinearWalls(array,[current[0]-1, current[1]+1], 1)
 
 def generateWorld(x, y, checkpoints, traps, swamps, visual, thermal):
     '''Perform generation of a world array'''
@@ -979,28 +625,28 @@ def generateWorld(x, y, checkpoints, traps, swamps, visual, thermal):
     if startEdge == 0:
         #Pick start position
         yStart = 0
-        xStart = random.randrange(0, len(array[0]))
+        xStart = random.randrange(0, array.width)
         #Set start direction
         startDir = 2
     #Right edge
     if startEdge == 1:
         #Pick start position
-        xStart = len(array[0]) - 1
-        yStart = random.randrange(0, len(array))
+        xStart = array.width - 1
+        yStart = random.randrange(0, array.height)
         #Set start direction
         startDir = 3
     #Bottom edge
     if startEdge == 2:
         #Pick start position
-        yStart = len(array) - 1
-        xStart = random.randrange(0, len(array[0]))
+        yStart = array.height - 1
+        xStart = random.randrange(0, array.width)
         #Set start direction
         startDir = 0
     #Left edge
     if startEdge == 3:
         #Pick start position
         xStart = 0
-        yStart = random.randrange(0, len(array))
+        yStart = random.randrange(0, array.height)
         #Set start direction
         startDir = 1
 
@@ -1008,23 +654,23 @@ def generateWorld(x, y, checkpoints, traps, swamps, visual, thermal):
     startTile = [xStart, yStart]
 
     #Add starting tile to start position
-    array[startTile[1]][startTile[0]].addGoal()
+    array.setSpecial(startTile[0], startTile[1], MapGrid.GOAL)
 
     #Calculate minimum orthogonal distance between start and end
     minDistance = min(10, int((x + y) / 2) + 1)
     possibleEnd = []
 
     #Iterate horizontal edges
-    for xEnd in range(0, len(array[0])):
-        for yEnd in [0, len(array) - 1]:
+    for xEnd in range(0, array.width):
+        for yEnd in [0, array.height - 1]:
             #Test if distance is enough
             if abs(xStart - xEnd) + abs(yStart - yEnd) - 1 >= minDistance:
                 #Add to possible end points
                 possibleEnd.append([xEnd, yEnd])
 
     #Iterate vertical edges
-    for yEnd in range(0, len(array)):
-        for xEnd in [0, len(array[0]) - 1]:
+    for yEnd in range(0, array.height):
+        for xEnd in [0, array.width - 1]:
             #Test if distance is enough
             if abs(xStart - xEnd) + abs(yStart - yEnd) - 1 >= minDistance:
                 #Add to possible end points
@@ -1044,8 +690,8 @@ def generateWorld(x, y, checkpoints, traps, swamps, visual, thermal):
     #Open some random spaces
     for i in range(0, int((x + y) / 2) ** 2):
         #Random position
-        randX = random.randrange(0, len(array[0]))
-        randY = random.randrange(0, len(array))
+        randX = random.randrange(0, array.width)
+        randY = random.randrange(0, array.height)
         #Get the valid directions
         allowedDirs = getAllAround(array, [randX, randY])[1]
         #If there are some positions that can be opened
@@ -1068,8 +714,7 @@ def generateWorld(x, y, checkpoints, traps, swamps, visual, thermal):
     humansAdded = addHumans(array, visual, thermal, x, y)
 
     #Set Linear or Floating flag
-    tile = array[startTile[1]][startTile[0]]
-    walls = tile.getWalls()
+    walls = array.getWalls(startTile[0], startTile[1])
     if walls[0]:
         setLinearWalls(array, startTile, 0)
     if walls[1]:
@@ -1113,16 +758,13 @@ def getTileAroundBlocking(array, xPos, yPos):
     #Default values - nothing
     wallBlocks = [False, False, False, False]
 
-    #Get the target tile
-    tile = array[yPos][xPos]
-
     #If this isn't a tile
-    if tile == None:
+    if not array.inBounds(xPos, yPos):
         #Return all blocked
         return [True, True, True, True]
 
     #Get the tile's walls
-    walls = tile.getWalls()
+    walls = array.getWalls(xPos, yPos)
 
     #Iterate for four directions
     for d in range(0, len(around)):
@@ -1132,15 +774,15 @@ def getTileAroundBlocking(array, xPos, yPos):
             wallBlocks[d] = True
         else:
             #If there isn't a wall
-            #Get the tile that is adjacent in the current direction
-            otherTile = array[yPos + around[d][1]][xPos + around[d][0]]
+            #Get the position that is adjacent in the current direction
+            otherPos = [xPos + around[d][0], yPos + around[d][1]]
             #If there is not a tile there
-            if otherTile == None:
+            if not array.inBounds(otherPos[0], otherPos[1]):
                 #That direction is blocked
                 wallBlocks[d] = True
             else:
                 #If there is a checkpoint, trap or swamp in that direction
-                if otherTile.getCheckpoint() or otherTile.getTrap() or otherTile.getSwamp():
+                if array.has(otherPos[0], otherPos[1], MapGrid.CHECKPOINT | MapGrid.TRAP | MapGrid.SWAMP):
                     #It is blocked
                     wallBlocks[d] = True
 
@@ -1192,14 +834,12 @@ def selectObstaclePositon(obstacle, array, x, y, obstacles, startPos):
         att -= 1
         #Get random tile position
         tPos = [random.randrange(0, x), random.randrange(0, y)]
-        #Get the tile (offset for start of grid)
-        tile = array[tPos[1]][tPos[0]]
-        #If this is a tile and not the start point
-        if tile != None and startTile != [tPos[0], tPos[1]]:
-            #If it is not a special tile and does not contain an obstacle already
-            if not tile.getCheckpoint() and not tile.getTrap() and not tile.getSwamp() and not tile.getObstacle() and not tile.getGoal() and not tile.hasHuman:
+        #If this is not the start point
+        if startTile != [tPos[0], tPos[1]]:
+            #If it is not a special tile and does not contain an obstacle or human already
+            if not array.has(tPos[0], tPos[1], MapGrid.SPECIAL | MapGrid.OBSTACLE | MapGrid.HUMAN):
                 #Target tile found
-                tSelected = tile
+                tSelected = [tPos[0], tPos[1]]
 
     #If no tile was selected
     if tSelected == None:
@@ -1270,7 +910,7 @@ def selectObstaclePositon(obstacle, array, x, y, obstacles, startPos):
     rot = round(random.uniform(0.00, 6.28), 3)
 
     #Add an obstacle to the selected tile
-    tSelected.addObstacle()
+    array.set(tSelected[0], tSelected[1], MapGrid.OBSTACLE)
 
     #Return the position data for the tile
     return [pos[0], 0, pos[1], rot, r]
@@ -1326,25 +966,23 @@ def generateWorldFile (world, obstacles, startPos, window):
     walls = []
 
     #Iterate vertically
-    for y in range(0, len(world)):
+    for y in range(0, world.height):
         #Create a row
         row = []
         #Iterate horizontally
-        for x in range(0, len(world[0])):
+        for x in range(0, world.width):
             #Add each tile [present, [uWall,rWall,dWall,lWall], checkpoint, trap, goal, swamp, humanType, humanWall, linearTile]
             row.append([False, [False, False, False, False], False, False, False, False, 0, 0, False])
         #Add row to array
         walls.append(row)
 
     #Iterate for each of the tiles
-    for y in range(0, len(world)):
-        for x in range(0, len(world[0])):
-            #If there is a tile there
-            if world[y][x] != None:
-                #Get the human data
-                humanInfo = world[y][x].getHumanData()
-                #Add the wall data
-                walls[y][x] = [True, world[y][x].getWalls(), world[y][x].getCheckpoint(), world[y][x].getTrap(), world[y][x].getGoal(), world[y][x].getSwamp(), humanInfo[0], humanInfo[1], world[y][x].getTileType()]
+    for y in range(0, world.height):
+        for x in range(0, world.width):
+            #Get the human data
+            humanInfo = world.getHumanData(x, y)
+            #Add the wall data
+            walls[y][x] = [True, world.getWalls(x, y), world.has(x, y, MapGrid.CHECKPOINT), world.has(x, y, MapGrid.TRAP), world.has(x, y, MapGrid.GOAL), world.has(x, y, MapGrid.SWAMP), humanInfo[0], humanInfo[1], world.has(x, y, MapGrid.LINEAR)]
 
     #Make a map from the walls and objects
     WorldCreator.makeFile(walls, obstacles, startPos, window)
@@ -0,0 +1,256 @@
+"""Map Grid v1
+   Written for the RescueMaze map generator
+
+Compact grid of the tiles of a generated map, one 16 bit word per tile in a
+single array (row by row) instead of an object per tile.
+
+Bits of a tile's word:
+ - 0-3: walls [up, right, down, left]
+ - 4-7: linear walls [up, right, down, left]
+ - 8: linear tile
+ - 9-12: checkpoint, trap, goal, swamp (at most one is set)
+ - 13: obstacle
+ - 14: human
+Human type and wall are kept in a table by tile as there are only a few humans.
+
+Features:
+ - Tiles start with all four walls and nothing else
+ - Whole grid queries (count and positions of tiles with given bits)
+ - Depth first maze carving in time linear in the number of tiles
+ - Articulation points of the maze (tiles that would split it if blocked)
+"""
+
+import array
+import random
+
+# Wall bits by direction [up, right, down, left]
+WALLS = [1, 2, 4, 8]
+ALL_WALLS = 15
+# Linear wall bits by direction [up, right, down, left]
+LINEAR_WALLS = [16, 32, 64, 128]
+LINEAR = 256
+CHECKPOINT = 512
+TRAP = 1024
+GOAL = 2048
+SWAMP = 4096
+OBSTACLE = 8192
+HUMAN = 16384
+
+# The special tile types (a tile has at most one)
+SPECIAL = CHECKPOINT | TRAP | GOAL | SWAMP
+
+# For each direction the direction facing back
+OPPOSITE = [2, 3, 0, 1]
+
+# State of each tile found by articulationPoints
+UNREACHABLE = 0
+REACHABLE = 1
+ARTICULATION = 2
+
+
+class MapGrid():
+    '''Grid of map tiles held as one word per tile'''
+
+    def __init__(self, width: int, height: int) -> None:
+        '''Create a grid of width by height tiles, each with all four walls'''
+        self.width = width
+        self.height = height
+        self.cells = array.array('H', [ALL_WALLS]) * (width * height)
+        # Tile index -> [human type, wall]
+        self.humans = {}
+
+    def index(self, x: int, y: int) -> int:
+        '''Get the position of a tile in the cells array'''
+        return y * self.width + x
+
+    def inBounds(self, x: int, y: int) -> bool:
+        '''Check if a position is in the grid'''
+        return x >= 0 and x < self.width and y >= 0 and y < self.height
+
+    def get(self, x: int, y: int) -> int:
+        '''Get the word of a tile'''
+        return self.cells[y * self.width + x]
+
+    def has(self, x: int, y: int, bits: int) -> bool:
+        '''Check if a tile has any of the given bits'''
+        return self.cells[y * self.width + x] & bits != 0
+
+    def set(self, x: int, y: int, bits: int) -> None:
+        '''Set bits of a tile'''
+        self.cells[y * self.width + x] |= bits
+
+    def clear(self, x: int, y: int, bits: int) -> None:
+        '''Clear bits of a tile'''
+        self.cells[y * self.width + x] &= ~bits & 0xFFFF
+
+    def setSpecial(self, x: int, y: int, special: int) -> None:
+        '''Make a tile a checkpoint, trap, goal or swamp (removing any other special type)'''
+        i = y * self.width + x
+        self.cells[i] = (self.cells[i] & ~SPECIAL & 0xFFFF) | special
+
+    def getWalls(self, x: int, y: int) -> list:
+        '''Get if each of the four walls [up, right, down, left] of a tile is present'''
+        cell = self.cells[y * self.width + x]
+        return [cell & 1 != 0, cell & 2 != 0, cell & 4 != 0, cell & 8 != 0]
+
+    def getLinearWalls(self, x: int, y: int) -> list:
+        '''Get if each of the four linear walls [up, right, down, left] of a tile is present'''
+        cell = self.cells[y * self.width + x]
+        return [cell & 16 != 0, cell & 32 != 0, cell & 64 != 0, cell & 128 != 0]
+
+    def addLinearWall(self, x: int, y: int, wall: int) -> bool:
+        '''Make a wall of a tile linear, returns false if there is no wall there'''
+        i = y * self.width + x
+        if self.cells[i] & WALLS[wall]:
+            self.cells[i] |= LINEAR_WALLS[wall]
+            return True
+        return False
+
+    def addHuman(self, x: int, y: int, humanType: int, wall: int) -> bool:
+        '''Add a human to a given wall, returns true only if a wall was present in that direction and the tile didn't contain a human'''
+        i = y * self.width + x
+        if wall >= 0 and wall < 4 and not self.cells[i] & HUMAN and self.cells[i] & WALLS[wall]:
+            self.cells[i] |= HUMAN
+            self.humans[i] = [humanType, wall]
+            return True
+        return False
+
+    def getHumanData(self, x: int, y: int) -> list:
+        '''Get the human type and the wall it is on (0, 0 if there is no human)'''
+        return self.humans.get(y * self.width + x, [0, 0])
+
+    def count(self, bits: int) -> int:
+        '''Get the number of tiles with any of the given bits'''
+        return sum(1 for cell in self.cells if cell & bits)
+
+    def positions(self, bits: int) -> list:
+        '''Get the [x, y] positions of the tiles with any of the given bits (row by row)'''
+        return [[i % self.width, i // self.width] for i, cell in enumerate(self.cells) if cell & bits]
+
+    def carveMaze(self, start: list) -> None:
+        '''Carve a maze from a start position [x, y] by depth first search (opening walls between tiles)
+
+        Tiles are picked in the same order, with the same random calls, as searching a list of visited positions,
+        so a seed gives the same maze, but visited tiles are kept in a bitmap and the path in a preallocated stack.'''
+        width = self.width
+        size = width * self.height
+        cells = self.cells
+        randrange = random.randrange
+
+        # Index offset of the tile in each direction [up, right, down, left]
+        offsets = [-width, 1, width, -1]
+        # Bits to clear in this tile and in the tile being opened to for each direction
+        thisWalls = [~WALLS[d] & 0xFFFF for d in range(4)]
+        otherWalls = [~WALLS[OPPOSITE[d]] & 0xFFFF for d in range(4)]
+
+        visited = bytearray(size)
+        stack = array.array('l', [0]) * size
+        # Directions that can be moved in from the current tile
+        usable = [0, 0, 0, 0]
+
+        i = self.index(start[0], start[1])
+        visited[i] = 1
+        stack[0] = i
+        top = 0
+
+        while top >= 0:
+            i = stack[top]
+            x = i % width
+
+            # Unvisited tiles around the current one (in direction order)
+            n = 0
+            if i >= width and not visited[i - width]:
+                usable[n] = 0
+                n += 1
+            if x < width - 1 and not visited[i + 1]:
+                usable[n] = 1
+                n += 1
+            if i + width < size and not visited[i + width]:
+                usable[n] = 2
+                n += 1
+            if x > 0 and not visited[i - 1]:
+                usable[n] = 3
+                n += 1
+
+            if n > 0:
+                # Open the wall to a random one and move to it
+                d = usable[randrange(0, n)]
+                j = i + offsets[d]
+                cells[i] &= thisWalls[d]
+                cells[j] &= otherWalls[d]
+                visited[j] = 1
+                top += 1
+                stack[top] = j
+            else:
+                # Go back a tile
+                top -= 1
+
+    def articulationPoints(self, start: list, blocking: int) -> bytearray:
+        '''Get the state of each tile (by index) in the graph of open walls between tiles without any of the blocking bits:
+        UNREACHABLE from the start [x, y], REACHABLE, or an ARTICULATION point (blocking it would cut tiles off from each other)
+
+        Tarjan's algorithm, run as a loop over a preallocated stack so large grids don't hit the recursion limit.'''
+        width = self.width
+        size = width * self.height
+        cells = self.cells
+        offsets = [-width, 1, width, -1]
+
+        state = bytearray(size)
+        # Order each tile was found in (0 if not found yet) and the earliest tile reachable from below it
+        found = array.array('l', [0]) * size
+        low = array.array('l', [0]) * size
+        parent = array.array('l', [-1]) * size
+        # Next direction to search from each tile
+        nextDir = bytearray(size)
+        stack = array.array('l', [0]) * size
+
+        root = self.index(start[0], start[1])
+        if cells[root] & blocking:
+            return state
+        found[root] = low[root] = 1
+        order = 1
+        rootChildren = 0
+        stack[0] = root
+        top = 0
+
+        while top >= 0:
+            v = stack[top]
+            d = nextDir[v]
+            if d < 4:
+                nextDir[v] = d + 1
+                # Skip walls, the edge of the grid and blocked tiles
+                if cells[v] & WALLS[d]:
+                    continue
+                x = v % width
+                if (d == 0 and v < width) or (d == 1 and x == width - 1) or (d == 2 and v + width >= size) or (d == 3 and x == 0):
+                    continue
+                w = v + offsets[d]
+                if cells[w] & blocking:
+                    continue
+
+                if found[w] == 0:
+                    # Search from the new tile
+                    order += 1
+                    found[w] = low[w] = order
+                    parent[w] = v
+                    top += 1
+                    stack[top] = w
+                    if v == root:
+                        rootChildren += 1
+                elif w != parent[v] and found[w] < low[v]:
+                    low[v] = found[w]
+            else:
+                # All directions searched, pass the lowest reachable back to the parent
+                state[v] = state[v] or REACHABLE
+                top -= 1
+                if top >= 0:
+                    p = stack[top]
+                    if low[v] < low[p]:
+                        low[p] = low[v]
+                    # Nothing below v reaches above p without going through p
+                    if p != root and low[v] >= found[p]:
+                        state[p] = ARTICULATION
+
+        if rootChildren > 1:
+            state[root] = ARTICULATION
+        return state
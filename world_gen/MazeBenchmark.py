@@ -0,0 +1,89 @@
+"""Maze Benchmark v1
+   Written for the RescueMaze map generator
+
+Times the depth first maze carving of the map generator on square grids of
+growing size, to check the time taken grows linearly with the number of tiles.
+
+The previous carver (keeping the visited tiles in a list of positions) is timed
+as well on the smaller grids, and checked to carve the same maze from the same
+seed.
+
+Usage:
+    python MazeBenchmark.py [--sizes 25 50 100 200 400] [--legacy-max N] [--repeats N] [--seed N]
+"""
+
+import argparse
+import random
+import time
+
+import MapGrid
+
+
+def listVisitedMaze (world, start):
+    '''Carve a maze the way the generator did before the bitmap carver (visited tiles in a list of positions)'''
+    around = [[0, -1], [1, 0], [0, 1], [-1, 0]]
+    visited = [start]
+    stack = [start]
+
+    while len(stack) > 0:
+        current = stack[-1]
+        usable = []
+        #Unvisited tiles around the current one
+        for d in range(0, 4):
+            otherPos = [current[0] + around[d][0], current[1] + around[d][1]]
+            if world.inBounds(otherPos[0], otherPos[1]) and otherPos not in visited:
+                usable.append([otherPos, d])
+
+        if len(usable) > 0:
+            #Open the wall to a random one and move to it
+            otherPos, d = usable[random.randrange(0, len(usable))]
+            world.clear(current[0], current[1], MapGrid.WALLS[d])
+            world.clear(otherPos[0], otherPos[1], MapGrid.WALLS[MapGrid.OPPOSITE[d]])
+            visited.append(otherPos)
+            stack.append(otherPos)
+        else:
+            #Go back a tile
+            del stack[-1]
+
+
+def timeCarve (carve, size: int, repeats: int, seed: int) -> tuple:
+    '''Get the best time (seconds) to carve a size by size maze, and the carved grid'''
+    best = None
+    grid = None
+    for r in range(0, repeats):
+        grid = MapGrid.MapGrid(size, size)
+        random.seed(seed)
+        start = time.perf_counter()
+        carve(grid, [0, 0])
+        taken = time.perf_counter() - start
+        if best is None or taken < best:
+            best = taken
+    return best, grid
+
+
+def runBenchmark (sizes: list, legacyMax: int, repeats: int, seed: int) -> None:
+    '''Print the carving time of each size of grid'''
+    print("{:>6} {:>9} {:>12} {:>14} {:>14}".format("size", "tiles", "time (ms)", "us per tile", "list (ms)"))
+    for size in sizes:
+        taken, grid = timeCarve(MapGrid.MapGrid.carveMaze, size, repeats, seed)
+        tiles = size * size
+
+        legacy = ""
+        if size <= legacyMax:
+            legacyTaken, legacyGrid = timeCarve(listVisitedMaze, size, 1, seed)
+            if legacyGrid.cells != grid.cells:
+                raise RuntimeError("Carvers gave different mazes for a {0} by {0} grid".format(size))
+            legacy = "{:.1f}".format(legacyTaken * 1000)
+
+        print("{:>6} {:>9} {:>12.1f} {:>14.3f} {:>14}".format(size, tiles, taken * 1000, taken / tiles * 1000000, legacy))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Time the maze carving of the map generator")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[25, 50, 100, 200, 400], help="widths of the square grids to carve")
+    parser.add_argument("--legacy-max", type=int, default=60, help="largest grid to also carve with the list based carver")
+    parser.add_argument("--repeats", type=int, default=3, help="times each grid is carved (the best is shown)")
+    parser.add_argument("--seed", type=int, default=0, help="random seed of the mazes")
+    args = parser.parse_args()
+
+    runBenchmark(args.sizes, args.legacy_max, args.repeats, args.seed)
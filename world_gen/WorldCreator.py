@@ -28,10 +28,17 @@ Changelog:
 
 
 from decimal import Decimal
+import importlib.util
 import os
 import random
 dirname = os.path.dirname(__file__)
 
+#The world parser is shared with the supervisor, it writes the world's sidecar file
+#Loaded from its file so the supervisor's directory isn't put on the import path
+worldParserSpec = importlib.util.spec_from_file_location("WorldParser", os.path.join(os.path.abspath(dirname), "..", "game", "controllers", "MainSupervisor", "WorldParser.py"))
+WorldParser = importlib.util.module_from_spec(worldParserSpec)
+worldParserSpec.loader.exec_module(WorldParser)
+
 #General scale for tiles - adjusts position and size of pieces and obstacles
 tileScale = [0.4, 0.4, 0.4]
 #The vertical position of the floor
@@ -474,3 +481,6 @@ def makeFile(boxData, obstacles, startPos, uiWindow = None):
     worldFile.write(data)
     #Close the file
     worldFile.close()
+
+    #Write the sidecar file the supervisor loads the world from
+    WorldParser.writeSidecar(filePath)